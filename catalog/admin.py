@@ -1,13 +1,68 @@
+from django.conf import settings
 from django.contrib import admin
-from .models import Author, Book, BookInstance, Genre, Language
+from .models import Author, Book, BookInstance, Genre, Language, Task
 
 
+class DeletedListFilter(admin.SimpleListFilter):
+    title = 'deleted'
+    parameter_name = 'deleted'
+
+    def lookups(self, request, model_admin):
+        return (('yes', 'Yes'), ('no', 'No'))
+
+    def queryset(self, request, queryset):
+        if self.value() == 'yes':
+            return queryset.filter(deleted_at__isnull=False)
+        if self.value() == 'no':
+            return queryset.filter(deleted_at__isnull=True)
+
+class SoftDeleteAdmin(admin.ModelAdmin):
+    """
+    Lists soft-deleted rows too and, with CATALOG_SOFT_DELETE on, soft-deletes
+    instead of cascading within the request; purge_deleted removes the rows later.
+    """
+    actions = ['restore_selected']
+
+    def get_queryset(self, request):
+        queryset = self.model.all_objects.get_queryset()
+        ordering = self.get_ordering(request)
+        if ordering:
+            queryset = queryset.order_by(*ordering)
+        return queryset
+
+    def get_deleted_objects(self, objs, request):
+        if not getattr(settings, 'CATALOG_SOFT_DELETE', False):
+            return super().get_deleted_objects(objs, request)
+
+        # Nothing cascades now, so skip collecting every dependent row
+        deleted_objects = [str(obj) for obj in objs]
+        model_count = {self.model._meta.verbose_name_plural: len(deleted_objects)}
+        return deleted_objects, model_count, set(), []
+
+    def delete_model(self, request, obj):
+        if not getattr(settings, 'CATALOG_SOFT_DELETE', False):
+            return super().delete_model(request, obj)
+        obj.soft_delete()
+
+    def delete_queryset(self, request, queryset):
+        if not getattr(settings, 'CATALOG_SOFT_DELETE', False):
+            return super().delete_queryset(request, queryset)
+        for obj in queryset:
+            obj.soft_delete()
+
+    def restore_selected(self, request, queryset):
+        for obj in queryset.filter(deleted_at__isnull=False):
+            obj.restore()
+
+    restore_selected.short_description = 'Restore selected %(verbose_name_plural)s'
+
 class BooksInline(admin.TabularInline):
     model = Book
 
 @admin.register(Author)
-class AuthorAdmin(admin.ModelAdmin):
-    list_display = ('last_name', 'first_name', 'date_of_birth', 'date_of_death')
+class AuthorAdmin(SoftDeleteAdmin):
+    list_display = ('last_name', 'first_name', 'date_of_birth', 'date_of_death', 'deleted_at')
+    list_filter = (DeletedListFilter,)
     fields = ['first_name', 'last_name', ('date_of_birth', 'date_of_death')]
     inlines = [BooksInline]
 
@@ -15,15 +70,16 @@ class BooksInstanceInline(admin.TabularInline):
     model = BookInstance
 
 @admin.register(Book)
-class BookAdmin(admin.ModelAdmin):
-    list_display = ('title', 'author', 'display_genre')
+class BookAdmin(SoftDeleteAdmin):
+    list_display = ('title', 'author', 'display_genre', 'deleted_at')
+    list_filter = (DeletedListFilter,)
     inlines = [BooksInstanceInline]
 
 @admin.register(BookInstance)
 class BookInstanceAdmin(admin.ModelAdmin):
     list_display = ('book', 'status', 'borrower', 'due_back', 'id')
     list_filter = ('status', 'due_back', 'book')
-    
+
     fieldsets = (
         (None, {
             'fields': ('book', 'imprint', 'id')
@@ -33,5 +89,18 @@ class BookInstanceAdmin(admin.ModelAdmin):
         }),
     )
 
+    def get_queryset(self, request):
+        # Include copies of soft-deleted books
+        queryset = BookInstance.all_objects.get_queryset()
+        ordering = self.get_ordering(request)
+        if ordering:
+            queryset = queryset.order_by(*ordering)
+        return queryset
+
+@admin.register(Task)
+class TaskAdmin(admin.ModelAdmin):
+    list_display = ('name', 'key', 'status', 'attempts', 'run_after', 'created')
+    list_filter = ('status', 'name')
+
 admin.site.register(Genre)
 admin.site.register(Language)
@@ -0,0 +1,222 @@
+from bisect import bisect_left, insort
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+
+import itertools
+import logging
+import threading
+import time
+
+from catalog.models import Author, Book
+
+logger = logging.getLogger(__name__)
+
+# Upper bound on indexed names, overridable with CATALOG_AUTOCOMPLETE_MAX_ENTRIES
+DEFAULT_MAX_ENTRIES = 200000
+
+# Only this many leading characters of each name are kept in the index
+MAX_KEY_LENGTH = 64
+
+# Shared counter bumped by every process which changes a book or author
+VERSION_KEY = 'catalog:autocomplete:version'
+
+# Seconds between checks of the shared version, and the age after which the
+# index is rebuilt anyway to pick up bulk updates which send no signals
+VERSION_CHECK_INTERVAL = 5
+MAX_INDEX_AGE = 60 * 10
+
+BOOK = 'book'
+AUTHOR = 'author'
+
+
+def normalize_prefix(value):
+    """Returns the lookup key for a name or a typed prefix"""
+    return ' '.join(value.casefold().split())[:MAX_KEY_LENGTH]
+
+
+def _make_entries(kind, object_id, names, label):
+    return {(normalize_prefix(name), kind, object_id, label) for name in names if name.strip()}
+
+
+class PrefixIndex:
+    """
+    In-memory prefix index over book titles and author names.
+
+    Entries are (key, kind, id, label) tuples kept in a sorted list, so a
+    prefix lookup is a bisect followed by a short scan.
+    """
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = []
+        self._entries_by_object = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def load(self, objects):
+        """Replaces the whole index with (kind, id, names, label) objects"""
+        entries = []
+        entries_by_object = {}
+        for kind, object_id, names, label in objects:
+            object_entries = _make_entries(kind, object_id, names, label)
+            if len(entries) + len(object_entries) > self.max_entries:
+                logger.warning('Autocomplete index is full, %s %s and later objects not indexed', kind, object_id)
+                break
+            entries.extend(object_entries)
+            entries_by_object[(kind, object_id)] = object_entries
+
+        # One sort instead of an insort per entry
+        entries.sort()
+        with self._lock:
+            self._entries = entries
+            self._entries_by_object = entries_by_object
+
+    def add(self, kind, object_id, names, label):
+        """Indexes an object under each of the given names, replacing older entries"""
+        with self._lock:
+            self._remove(kind, object_id)
+
+            entries = _make_entries(kind, object_id, names, label)
+            if len(self._entries) + len(entries) > self.max_entries:
+                logger.warning('Autocomplete index is full, %s %s not indexed', kind, object_id)
+                return
+
+            for entry in entries:
+                insort(self._entries, entry)
+            self._entries_by_object[(kind, object_id)] = entries
+
+    def remove(self, kind, object_id):
+        with self._lock:
+            self._remove(kind, object_id)
+
+    def _remove(self, kind, object_id):
+        for entry in self._entries_by_object.pop((kind, object_id), ()):
+            i = bisect_left(self._entries, entry)
+            if i < len(self._entries) and self._entries[i] == entry:
+                del self._entries[i]
+
+    def search(self, prefix, limit=10, kind=None):
+        """Returns up to `limit` (kind, id, label) matches in alphabetical order"""
+        key = normalize_prefix(prefix)
+        if not key:
+            return []
+
+        results = []
+        seen = set()
+        with self._lock:
+            i = bisect_left(self._entries, (key,))
+            while i < len(self._entries) and len(results) < limit:
+                entry_key, entry_kind, object_id, label = self._entries[i]
+                if not entry_key.startswith(key):
+                    break
+                if (kind is None or entry_kind == kind) and (entry_kind, object_id) not in seen:
+                    seen.add((entry_kind, object_id))
+                    results.append((entry_kind, object_id, label))
+                i += 1
+        return results
+
+
+def _author_names(author):
+    # Match on either name, e.g. "tolk" and "j.r.r" both find Tolkien
+    return [author.last_name, author.first_name, f'{author.first_name} {author.last_name}']
+
+
+class CatalogAutocomplete(PrefixIndex):
+    """
+    Prefix index loaded from Book and Author on first use.
+
+    Signals update the index of the process making a change and bump a
+    shared version, so other processes rebuild theirs once their next search
+    notices. Only the first build runs in the request, later rebuilds run in
+    a background thread while searches keep using the current index.
+    """
+
+    def __init__(self):
+        super().__init__(getattr(settings, 'CATALOG_AUTOCOMPLETE_MAX_ENTRIES', DEFAULT_MAX_ENTRIES))
+        self.is_built = False
+        self.version = None
+        self._built_at = 0
+        self._checked_at = 0
+        self._build_lock = threading.Lock()
+        self._rebuild_thread = None
+
+    def ensure_current(self):
+        """Builds the index if it is missing, or starts a rebuild if it is outdated or too old"""
+        now = time.monotonic()
+        if self.is_built and now - self._checked_at < VERSION_CHECK_INTERVAL:
+            return
+        self._checked_at = now
+
+        version = cache.get(VERSION_KEY, 0)
+        if self.is_built and version == self.version and now - self._built_at < MAX_INDEX_AGE:
+            return
+
+        with self._build_lock:
+            if self.is_built and version == self.version and time.monotonic() - self._built_at < MAX_INDEX_AGE:
+                return
+            if not self.is_built:
+                self.rebuild(version)
+            elif self._rebuild_thread is None or not self._rebuild_thread.is_alive():
+                self._rebuild_thread = threading.Thread(
+                    target=self._rebuild_in_background, args=(version,), name='autocomplete-rebuild', daemon=True)
+                self._rebuild_thread.start()
+
+    def _rebuild_in_background(self, version):
+        try:
+            self.rebuild(version)
+        except Exception:
+            # Keep the current index, the next version check tries again
+            logger.exception('Rebuilding the autocomplete index failed')
+        finally:
+            # Database connections are per thread, close this one
+            connection.close()
+
+    def rebuild(self, version):
+        books = (
+            (BOOK, book_id, [title], title)
+            for book_id, title in Book.objects.values_list('id', 'title').iterator()
+        )
+        authors = (
+            (AUTHOR, author.id, _author_names(author), str(author))
+            for author in Author.objects.only('id', 'first_name', 'last_name').iterator()
+        )
+        self.load(itertools.chain(books, authors))
+        self.version = version
+        self._built_at = time.monotonic()
+        self.is_built = True
+
+    def mark_changed(self):
+        """Bumps the shared version after this process updated its own index"""
+        try:
+            version = cache.incr(VERSION_KEY)
+        except ValueError:
+            cache.set(VERSION_KEY, 1, None)
+            version = 1
+
+        # Only skip the rebuild if no other process changed anything meanwhile
+        if self.version == version - 1:
+            self.version = version
+
+    def update_book(self, book):
+        if self.is_built:
+            self.add(BOOK, book.id, [book.title], book.title)
+        self.mark_changed()
+
+    def update_author(self, author):
+        if self.is_built:
+            self.add(AUTHOR, author.id, _author_names(author), str(author))
+        self.mark_changed()
+
+    def remove_object(self, kind, object_id):
+        self.remove(kind, object_id)
+        self.mark_changed()
+
+    def search(self, prefix, limit=10, kind=None):
+        self.ensure_current()
+        return super().search(prefix, limit, kind)
+
+
+autocomplete_index = CatalogAutocomplete()
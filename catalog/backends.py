@@ -0,0 +1,52 @@
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
+
+# Cache keys for the permission sets loaded by CachedPermissionBackend
+PERMISSIONS_VERSION_KEY = 'catalog:perms:version'
+PERMISSIONS_TIMEOUT = 60 * 5
+
+
+def permissions_cache_key(user_id):
+    """Returns the cache key holding the permissions of the given user"""
+    return f'catalog:perms:{user_id}'
+
+
+def invalidate_user_permissions(*user_ids):
+    """Drops the cached permissions of the given users"""
+    cache.delete_many([permissions_cache_key(user_id) for user_id in user_ids])
+
+
+def invalidate_all_permissions():
+    """Drops the cached permissions of every user, e.g. after a group changes"""
+    try:
+        cache.incr(PERMISSIONS_VERSION_KEY)
+    except ValueError:
+        cache.set(PERMISSIONS_VERSION_KEY, 2, None)
+
+
+class CachedPermissionBackend(ModelBackend):
+    """
+    Model backend which loads a user's permissions once and keeps them in
+    the cache, so `perms.*` checks in templates and PermissionRequiredMixin
+    views skip the user/group permission joins on subsequent requests.
+
+    The cache must be shared by all worker processes (see catalog/checks.py),
+    otherwise a revoked permission stays cached in the other workers.
+    """
+
+    def get_all_permissions(self, user_obj, obj=None):
+        if not user_obj.is_active or user_obj.is_anonymous or obj is not None:
+            return set()
+        if not hasattr(user_obj, '_perm_cache'):
+            # Fetch the permissions and the global version in one round trip
+            key = permissions_cache_key(user_obj.pk)
+            cached = cache.get_many([key, PERMISSIONS_VERSION_KEY])
+            version = cached.get(PERMISSIONS_VERSION_KEY, 1)
+
+            if key in cached and cached[key][0] == version:
+                perms = cached[key][1]
+            else:
+                perms = super().get_all_permissions(user_obj)
+                cache.set(key, (version, perms), PERMISSIONS_TIMEOUT)
+            user_obj._perm_cache = perms
+        return user_obj._perm_cache
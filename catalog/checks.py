@@ -0,0 +1,30 @@
+from django.conf import settings
+from django.core.checks import Tags, Warning, register
+
+# Cache backends which are not shared between worker processes
+PROCESS_LOCAL_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+@register(Tags.security)
+def check_shared_cache(app_configs, **kwargs):
+    """Warns if the catalog's cached data can't be shared or invalidated across workers"""
+    backend = settings.CACHES['default']['BACKEND']
+    if backend not in PROCESS_LOCAL_CACHES:
+        return []
+
+    if 'catalog.backends.CachedPermissionBackend' in settings.AUTHENTICATION_BACKENDS:
+        hint = 'Revoked permissions stay cached in other workers.'
+    else:
+        hint = 'Cached loans and counts go stale in other workers.'
+
+    return [
+        Warning(
+            f'{backend} is not shared between processes, but the catalog caches permissions, '
+            f'loans and the home page counts written by `manage.py run_tasks`.',
+            hint=hint + ' Use a shared cache such as DatabaseCache or Memcached.',
+            id='catalog.W001',
+        )
+    ]
@@ -0,0 +1,105 @@
+# catalog/edit_views.py
+# Rarely used views, which pull in the forms and generic editing views.
+# catalog/urls.py only imports them when first requested, see catalog/lazy.py.
+
+from django.conf import settings
+from django.contrib.auth.decorators import permission_required
+from django.contrib.auth.mixins import PermissionRequiredMixin
+from django.http import HttpResponseRedirect
+from django.shortcuts import get_object_or_404, render
+from django.urls import reverse, reverse_lazy
+from django.views.generic.edit import CreateView, UpdateView, DeleteView
+
+import datetime
+
+from .forms import RenewBookModelForm
+from catalog.models import Author, Book, BookInstance
+
+@permission_required('catalog.can_renew')
+def bookinstance_renew_view(request, bookinstance_id):
+    bookinstance_item = get_object_or_404(BookInstance, id=bookinstance_id)
+
+    # If this is a POST request, process the Form data
+    if request.method == 'POST':
+
+        # Create a form instance and populate it with data from the request
+        renew_book_form = RenewBookModelForm(request.POST)
+        valid = renew_book_form.is_valid()
+
+        # Validate
+        if renew_book_form.is_valid():
+            # Process/save validated data
+            bookinstance_item.due_back = renew_book_form.cleaned_data['due_back']
+            bookinstance_item.save()
+
+            # Redirect
+            return HttpResponseRedirect(reverse('loaned-books'))
+        
+    else:
+        proposed_renewal_date = datetime.date.today() + datetime.timedelta(weeks=3)
+        initial_data = {
+                'due_back': proposed_renewal_date,
+        }
+        renew_book_form = RenewBookModelForm(initial=initial_data)
+
+    context = {
+            'form': renew_book_form,
+            'bookinstance_item': bookinstance_item,
+    }
+
+    return render(request, 'catalog/bookinstance_renew.html', context)
+
+
+class SoftDeleteMixin:
+    """
+    Hides the object instead of deleting it when CATALOG_SOFT_DELETE is on,
+    leaving dependent rows to the purge_deleted command.
+    """
+
+    def delete(self, request, *args, **kwargs):
+        if not getattr(settings, 'CATALOG_SOFT_DELETE', False):
+            return super().delete(request, *args, **kwargs)
+
+        self.object = self.get_object()
+        success_url = self.get_success_url()
+        self.object.soft_delete()
+        return HttpResponseRedirect(success_url)
+
+
+class AuthorCreateView(PermissionRequiredMixin, CreateView):
+    model = Author
+    fields = '__all__'
+    permission_required = 'catalog.can_edit_authors'
+
+class AuthorUpdateView(PermissionRequiredMixin, UpdateView):
+    model = Author
+    fields = ['first_name', 'last_name', 'date_of_birth', 'date_of_death']
+    permission_required = 'catalog.can_edit_authors'
+    template_name_suffix = '_update_form'
+
+class AuthorDeleteView(PermissionRequiredMixin, SoftDeleteMixin, DeleteView):
+    model = Author
+    success_url = reverse_lazy('author-list')
+    template_name_suffix = '_delete_confirmation'
+    permission_required = 'catalog.can_edit_authors'
+
+class BookCreateView(PermissionRequiredMixin, CreateView):
+    model = Book
+    permission_required = 'catalog.can_edit_books'
+    fields = '__all__'
+    template_name_suffix = '_create_form'
+
+class BookUpdateView(PermissionRequiredMixin, UpdateView):
+    model = Book
+    permission_required = 'catalog.can_edit_books'
+    fields = '__all__'
+    exclude = ['id']
+    template_name_suffix = '_update_form'
+    pk_url_kwarg = 'book_id'
+
+class BookDeleteView(PermissionRequiredMixin, SoftDeleteMixin, DeleteView):
+    model = Book
+    success_url = reverse_lazy('book-list')
+    template_name_suffix = '_confirm_delete'
+    permission_required = 'catalog.can_edit_books'
+    pk_url_kwarg = 'book_id'
@@ -0,0 +1,68 @@
+from django.core.exceptions import ValidationError
+from django.utils.translation import ugettext_lazy as _
+
+import re
+
+# Characters allowed as separators in a printed ISBN
+ISBN_SEPARATORS = re.compile(r'[\s-]')
+
+
+def _isbn10_check_digit(digits):
+    """Returns the check character for the first 9 digits of an ISBN-10"""
+    total = sum((10 - i) * int(d) for i, d in enumerate(digits[:9]))
+    check = (11 - total % 11) % 11
+    return 'X' if check == 10 else str(check)
+
+
+def _isbn13_check_digit(digits):
+    """Returns the check digit for the first 12 digits of an ISBN-13"""
+    total = sum((3 if i % 2 else 1) * int(d) for i, d in enumerate(digits[:12]))
+    return str((10 - total % 10) % 10)
+
+
+def normalize_isbn(value):
+    """
+    Returns the canonical ISBN-13 form of the given ISBN-10 or ISBN-13.
+
+    Hyphens and spaces are ignored. Raises ValidationError if the value
+    is not a well-formed ISBN or its check digit does not match.
+    """
+    isbn = ISBN_SEPARATORS.sub('', value or '').upper()
+
+    if len(isbn) == 10 and isbn[:9].isdigit() and (isbn[9].isdigit() or isbn[9] == 'X'):
+        if _isbn10_check_digit(isbn) != isbn[9]:
+            raise ValidationError(
+                _('Invalid ISBN %(value)s. The check digit does not match.'),
+                code='invalid',
+                params={'value': value},
+            )
+        isbn = '978' + isbn[:9]
+        return isbn + _isbn13_check_digit(isbn)
+
+    if len(isbn) == 13 and isbn.isdigit() and isbn[:3] in ('978', '979'):
+        if _isbn13_check_digit(isbn) != isbn[12]:
+            raise ValidationError(
+                _('Invalid ISBN %(value)s. The check digit does not match.'),
+                code='invalid',
+                params={'value': value},
+            )
+        return isbn
+
+    raise ValidationError(
+        _('Invalid ISBN %(value)s. Enter a 10 or 13-digit ISBN.'),
+        code='invalid',
+        params={'value': value},
+    )
+
+
+def canonical_isbn(value):
+    """Returns the normalized ISBN, or None if the value is not a valid ISBN"""
+    try:
+        return normalize_isbn(value)
+    except ValidationError:
+        return None
+
+
+def validate_isbn(value):
+    """Field validator accepting any ISBN-10 or ISBN-13 form"""
+    normalize_isbn(value)
@@ -0,0 +1,74 @@
+from django.conf import settings
+from django.urls import URLResolver
+from django.utils.module_loading import import_string
+
+import inspect
+import threading
+
+
+def lazy_view(dotted_path, **initkwargs):
+    """
+    Returns a view which imports the view function or class at `dotted_path`
+    on its first request. With settings.LAZY_VIEWS off it is imported now.
+    """
+    def load():
+        view = import_string(dotted_path)
+        if inspect.isclass(view):
+            view = view.as_view(**initkwargs)
+        return view
+
+    if not getattr(settings, 'LAZY_VIEWS', False):
+        return load()
+
+    loaded = []
+    lock = threading.Lock()
+
+    def view(request, *args, **kwargs):
+        if not loaded:
+            with lock:
+                if not loaded:
+                    loaded.append(load())
+        return loaded[0](request, *args, **kwargs)
+
+    view.lazy_view_path = dotted_path
+    return view
+
+
+class LazyURLResolver(URLResolver):
+    """
+    URLResolver which loads its patterns when a URL under it is resolved or
+    reversed, instead of when the parent URLconf is first populated (which
+    happens on the first {% url %} of any page).
+
+    Only useful for namespaced includes, whose patterns the parent doesn't
+    need for reversing its own names.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._used = False
+
+    def _populate(self):
+        if self._used:
+            super()._populate()
+
+    def resolve(self, path):
+        # The root URLconf tries every prefix, so only a match counts as use
+        if self.pattern.match(str(path)):
+            self._used = True
+        return super().resolve(path)
+
+    @property
+    def reverse_dict(self):
+        self._used = True
+        return super().reverse_dict
+
+    @property
+    def namespace_dict(self):
+        self._used = True
+        return super().namespace_dict
+
+    @property
+    def app_dict(self):
+        self._used = True
+        return super().app_dict
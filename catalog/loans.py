@@ -0,0 +1,92 @@
+from django.core.cache import cache
+from django.db.models import Case, CharField, Value, When
+
+import datetime
+
+from catalog.models import BookInstance
+
+# Due date buckets, in display order
+OVERDUE = 'overdue'
+DUE_THIS_WEEK = 'due_this_week'
+LATER = 'later'
+
+LOAN_BUCKETS = (
+    (OVERDUE, 'Overdue'),
+    (DUE_THIS_WEEK, 'Due this week'),
+    (LATER, 'Due later'),
+)
+
+LOANS_TIMEOUT = 60 * 60
+
+# Shared counter bumped by bulk changes which send no signals, such as the
+# merges in dedupe_books, and may change the cached loans of any user
+LOANS_VERSION_KEY = 'catalog:loans:version'
+
+
+def loans_cache_key(user_id, today=None):
+    # Buckets shift at midnight, so each day gets its own key
+    today = today or datetime.date.today()
+    return f'catalog:loans:{user_id}:{today.isoformat()}'
+
+
+def invalidate_user_loans(*user_ids):
+    """Drops the cached loans of the given users"""
+    cache.delete_many([loans_cache_key(user_id) for user_id in user_ids if user_id is not None])
+
+
+def invalidate_all_loans():
+    """Drops the cached loans of every user, e.g. after copies were moved with update()"""
+    try:
+        cache.incr(LOANS_VERSION_KEY)
+    except ValueError:
+        cache.set(LOANS_VERSION_KEY, 2, None)
+
+
+def get_user_loans(user):
+    """
+    Returns the books on loan to the given user as dicts with the book's
+    title, author and url, the due date and its `due_bucket`.
+    """
+    today = datetime.date.today()
+    key = loans_cache_key(user.pk, today)
+
+    # Fetch the loans and the global version in one round trip
+    cached = cache.get_many([key, LOANS_VERSION_KEY])
+    version = cached.get(LOANS_VERSION_KEY, 1)
+    if key in cached and cached[key][0] == version:
+        return cached[key][1]
+
+    loans = (
+        BookInstance.objects
+        .filter(borrower=user, status__exact=BookInstance.ON_LOAN)
+        .select_related('book__author')
+        .annotate(due_bucket=Case(
+            When(due_back__lt=today, then=Value(OVERDUE)),
+            When(due_back__lte=today + datetime.timedelta(weeks=1), then=Value(DUE_THIS_WEEK)),
+            default=Value(LATER),
+            output_field=CharField(),
+        ))
+        .order_by('due_back')
+    )
+    # Plain values, so the cache holds no model instances
+    loans = [
+        {
+            'id': str(loan.id),
+            'title': loan.book.title,
+            'author': str(loan.book.current_author) if loan.book.current_author else None,
+            'due_back': loan.due_back,
+            'url': loan.book.get_absolute_url(),
+            'due_bucket': loan.due_bucket,
+        }
+        for loan in loans
+    ]
+    cache.set(key, (version, loans), LOANS_TIMEOUT)
+    return loans
+
+
+def group_loans(loans):
+    """Returns (bucket, label, loans) for each due date bucket"""
+    return [
+        (bucket, label, [loan for loan in loans if loan['due_bucket'] == bucket])
+        for bucket, label in LOAN_BUCKETS
+    ]
@@ -0,0 +1,59 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from catalog.backends import invalidate_user_permissions
+from catalog.models import Book
+
+MODEL_BACKEND = 'django.contrib.auth.backends.ModelBackend'
+
+
+class Command(BaseCommand):
+    help = ('Counts queries on permission-heavy pages with the plain ModelBackend, '
+            'and with a cold and a warm permission cache')
+
+    def add_arguments(self, parser):
+        parser.add_argument('username', help='User to render the pages as')
+        parser.add_argument('--requests', type=int, default=5,
+                help='Number of warm requests per page')
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['username'])
+        except User.DoesNotExist:
+            raise CommandError(f'User {options["username"]!r} does not exist')
+
+        urls = [reverse('index'), reverse('book-list'), reverse('loaned-books')]
+        book = Book.objects.order_by('id').first()
+        if book:
+            urls.append(book.get_absolute_url())
+
+        client = Client(SERVER_NAME='localhost')
+        client.force_login(user)
+        # Fill the other caches first (catalog stats, session), so only the permission lookups differ
+        for url in urls:
+            client.get(url)
+
+        # The baseline: what each request costs without the permission cache
+        with override_settings(AUTHENTICATION_BACKENDS=[MODEL_BACKEND]):
+            model_client = Client(SERVER_NAME='localhost')
+            model_client.force_login(user, backend=MODEL_BACKEND)
+            baseline = {
+                url: max(self.count_queries(model_client, url) for _ in range(options['requests']))
+                for url in urls
+            }
+
+        self.stdout.write(f'{"Page":40} {"Model":>6} {"Cold":>6} {"Warm":>6}')
+        for url in urls:
+            invalidate_user_permissions(user.pk)
+            cold = self.count_queries(client, url)
+            warm = max(self.count_queries(client, url) for _ in range(options['requests']))
+            self.stdout.write(f'{url:40} {baseline[url]:>6} {cold:>6} {warm:>6}')
+
+    def count_queries(self, client, url):
+        with CaptureQueriesContext(connection) as queries:
+            client.get(url)
+        return len(queries)
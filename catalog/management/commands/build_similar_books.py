@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from catalog.similarity import build_similar_books
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the similar books shown on the book detail page'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500,
+                help='Number of books whose similar books are written per transaction')
+
+    def handle(self, *args, **options):
+        num_books = build_similar_books(options['batch_size'])
+        self.stdout.write(f'Computed similar books for {num_books} book(s)')
@@ -0,0 +1,136 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Min, Q
+
+from collections import defaultdict
+
+from catalog.isbn import canonical_isbn
+from catalog.loans import invalidate_all_loans
+from catalog.models import Book, BookInstance
+
+
+class Command(BaseCommand):
+    help = 'Normalizes book ISBNs and merges books sharing the same ISBN'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500,
+                help='Number of books or ISBN groups processed per transaction')
+        parser.add_argument('--dry-run', action='store_true',
+                help='Report the changes without making them')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        dry_run = options['dry_run']
+
+        books_by_isbn = self.normalize_isbns(batch_size, dry_run)
+        if dry_run:
+            self.report_duplicates(books_by_isbn)
+        else:
+            self.merge_duplicates(batch_size)
+
+    def normalize_isbns(self, batch_size, dry_run):
+        """
+        Rewrites stored ISBNs in their canonical ISBN-13 form, soft-deleted
+        books included so Book.clean() sees their ISBNs too.
+
+        Returns the canonical ISBN -> [(id, deleted)] map of every book, which
+        a dry run groups on since nothing is rewritten.
+        """
+        updated = invalid = 0
+        last_id = 0
+        books_by_isbn = defaultdict(list)
+
+        while True:
+            batch = list(
+                Book.all_objects.filter(id__gt=last_id).order_by('id')
+                .values_list('id', 'isbn', 'deleted_at')[:batch_size]
+            )
+            if not batch:
+                break
+            last_id = batch[-1][0]
+
+            changes = {}
+            for book_id, isbn, deleted_at in batch:
+                normalized_isbn = canonical_isbn(isbn)
+                if normalized_isbn is None:
+                    invalid += 1
+                    self.stderr.write(f'Book {book_id} has an invalid ISBN: {isbn!r}')
+                elif normalized_isbn != isbn:
+                    changes[book_id] = normalized_isbn
+                if dry_run:
+                    books_by_isbn[normalized_isbn or isbn].append((book_id, deleted_at is not None))
+
+            if changes and not dry_run:
+                with transaction.atomic():
+                    for book_id, normalized_isbn in changes.items():
+                        Book.all_objects.filter(id=book_id).update(isbn=normalized_isbn)
+            updated += len(changes)
+
+        action = 'Would normalize' if dry_run else 'Normalized'
+        self.stdout.write(f'{action} {updated} ISBN(s), {invalid} invalid')
+        return books_by_isbn
+
+    def report_duplicates(self, books_by_isbn):
+        """Prints the merges merge_duplicates would make, grouped on the canonical ISBNs"""
+        merged = 0
+        for isbn, books in sorted(books_by_isbn.items()):
+            if len(books) < 2:
+                continue
+            live_ids = [book_id for book_id, deleted in books if not deleted]
+            keep_id = min(live_ids or [book_id for book_id, deleted in books])
+            duplicate_ids = sorted(book_id for book_id, deleted in books if book_id != keep_id)
+            self.stdout.write(f'ISBN {isbn}: keeping book {keep_id}, merging {duplicate_ids}')
+            merged += len(duplicate_ids)
+
+        self.stdout.write(f'Would merge {merged} duplicate book(s)')
+
+    def merge_duplicates(self, batch_size):
+        """
+        Merges each group of books sharing an ISBN into its oldest live book,
+        or its oldest book if all of them are soft-deleted
+        """
+        merged = 0
+        last_isbn = ''
+
+        while True:
+            groups = list(
+                Book.all_objects.filter(isbn__gt=last_isbn)
+                .values('isbn')
+                .annotate(
+                    num_books=Count('id'),
+                    live_id=Min('id', filter=Q(deleted_at__isnull=True)),
+                    first_id=Min('id'),
+                )
+                .filter(num_books__gt=1)
+                .order_by('isbn')[:batch_size]
+            )
+            if not groups:
+                break
+            last_isbn = groups[-1]['isbn']
+
+            with transaction.atomic():
+                for group in groups:
+                    merged += self.merge_group(group['isbn'], group['live_id'] or group['first_id'])
+
+        # Copies were moved with update(), which sends no signals
+        if merged:
+            invalidate_all_loans()
+
+        self.stdout.write(f'Merged {merged} duplicate book(s)')
+
+    def merge_group(self, isbn, keep_id):
+        duplicate_ids = list(Book.all_objects.filter(isbn=isbn).exclude(id=keep_id).values_list('id', flat=True))
+        self.stdout.write(f'ISBN {isbn}: keeping book {keep_id}, merging {duplicate_ids}')
+
+        # Move the copies and genres over before deleting the duplicates
+        BookInstance.all_objects.filter(book_id__in=duplicate_ids).update(book_id=keep_id)
+
+        GenreLink = Book.genre.through
+        existing_genre_ids = set(GenreLink.objects.filter(book_id=keep_id).values_list('genre_id', flat=True))
+        genre_ids = set(GenreLink.objects.filter(book_id__in=duplicate_ids).values_list('genre_id', flat=True))
+        GenreLink.objects.bulk_create(
+            GenreLink(book_id=keep_id, genre_id=genre_id) for genre_id in genre_ids - existing_genre_ids
+        )
+
+        Book.all_objects.filter(id__in=duplicate_ids).delete()
+        return len(duplicate_ids)
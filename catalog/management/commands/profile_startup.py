@@ -0,0 +1,103 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+import json
+import os
+import subprocess
+import sys
+
+# Run in a fresh interpreter, so nothing is imported yet. Loads the WSGI
+# application, then times the first request to each URL and records which
+# modules that request had to import.
+PROFILE_SCRIPT = '''
+import io, json, os, sys, time
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', %(settings)r)
+started = time.perf_counter()
+from locallibrary.wsgi import application
+boot_time = time.perf_counter() - started
+
+def start_response(status, headers, exc_info=None):
+    statuses.append(status)
+
+requests = []
+for url in %(urls)r:
+    statuses = []
+    modules_before = set(sys.modules)
+    environ = {
+        'REQUEST_METHOD': 'GET', 'PATH_INFO': url, 'QUERY_STRING': '',
+        'SERVER_NAME': %(host)r, 'SERVER_PORT': '80', 'SERVER_PROTOCOL': 'HTTP/1.1',
+        'wsgi.url_scheme': 'http', 'wsgi.input': io.BytesIO(), 'wsgi.errors': sys.stderr,
+    }
+    started = time.perf_counter()
+    response = application(environ, start_response)
+    b''.join(response)
+    response.close()
+    requests.append({
+        'url': url,
+        'status': statuses[0],
+        'seconds': time.perf_counter() - started,
+        'imported': sorted(set(sys.modules) - modules_before),
+    })
+
+print(json.dumps({'boot_seconds': boot_time, 'requests': requests}))
+'''
+
+
+class Command(BaseCommand):
+    help = 'Reports import time per module and first-request latency of a cold WSGI worker'
+
+    def add_arguments(self, parser):
+        parser.add_argument('urls', nargs='*', default=['/catalog/', '/catalog/books/'],
+                help='URLs requested, in order, after the application loads')
+        parser.add_argument('--top', type=int, default=20,
+                help='Number of slowest modules listed')
+        parser.add_argument('--prefix', default='',
+                help='Only list modules starting with this prefix, e.g. catalog')
+        parser.add_argument('--host', default='localhost',
+                help='Host name the requests are sent to, must be in ALLOWED_HOSTS')
+
+    def handle(self, *args, **options):
+        script = PROFILE_SCRIPT % {
+            'settings': os.environ.get('DJANGO_SETTINGS_MODULE', 'locallibrary.settings'),
+            'urls': options['urls'],
+            'host': options['host'],
+        }
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', script],
+            cwd=settings.BASE_DIR,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            universal_newlines=True,
+        )
+        if result.returncode:
+            raise CommandError(result.stderr[-2000:])
+
+        report = json.loads(result.stdout.strip().splitlines()[-1])
+        import_times = self.parse_import_times(result.stderr)
+
+        self.stdout.write(f'Application loaded in {report["boot_seconds"] * 1000:.1f} ms')
+        self.stdout.write(f'\n{"Self (ms)":>10} {"Total (ms)":>11}  Module')
+        modules = [row for row in import_times if row[2].startswith(options['prefix'])]
+        for self_us, cumulative_us, module in sorted(modules, key=lambda row: -row[1])[:options['top']]:
+            self.stdout.write(f'{self_us / 1000:>10.1f} {cumulative_us / 1000:>11.1f}  {module}')
+
+        self.stdout.write(f'\n{"First request (ms)":>18} {"Imports":>8}  URL')
+        for request in report['requests']:
+            self.stdout.write(
+                f'{request["seconds"] * 1000:>18.1f} {len(request["imported"]):>8}  '
+                f'{request["url"]} ({request["status"]})'
+            )
+            for module in request['imported']:
+                if module.startswith(options['prefix']) and options['verbosity'] > 1:
+                    self.stdout.write(f'{"":>28}{module}')
+
+    def parse_import_times(self, output):
+        """Returns (self, cumulative, module) rows from `python -X importtime` output"""
+        rows = []
+        for line in output.splitlines():
+            if not line.startswith('import time:') or 'self [us]' in line:
+                continue
+            self_us, cumulative_us, module = line[len('import time:'):].split('|')
+            rows.append((int(self_us), int(cumulative_us), module.strip()))
+        return rows
@@ -0,0 +1,87 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+import datetime
+
+from catalog.models import Author, Book, BookInstance
+
+
+class Command(BaseCommand):
+    help = 'Removes soft-deleted books and authors, detaching their dependent rows in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500,
+                help='Number of dependent rows removed or updated per transaction')
+        parser.add_argument('--older-than', type=int, default=0, metavar='MINUTES',
+                help='Only purge rows deleted at least this many minutes ago')
+
+    def handle(self, *args, **options):
+        self.batch_size = options['batch_size']
+        cutoff = timezone.now() - datetime.timedelta(minutes=options['older_than'])
+
+        book_ids = list(Book.all_objects.filter(deleted_at__lte=cutoff).values_list('id', flat=True))
+        purged_books = sum(self.purge_book(book_id) for book_id in book_ids)
+
+        author_ids = list(Author.all_objects.filter(deleted_at__lte=cutoff).values_list('id', flat=True))
+        purged_authors = sum(self.purge_author(author_id) for author_id in author_ids)
+
+        self.stdout.write(f'Purged {purged_books} book(s) and {purged_authors} author(s)')
+
+    def in_batches(self, queryset):
+        """Yields lists of primary keys from the queryset until it is empty"""
+        while True:
+            ids = list(queryset.values_list('pk', flat=True)[:self.batch_size])
+            if not ids:
+                break
+            yield ids
+
+    def still_deleted(self, model, object_id):
+        """
+        Locks the row and checks it is still soft-deleted, so a restore made
+        while the purge runs stops it before the next batch
+        """
+        if model.all_objects.select_for_update().filter(id=object_id, deleted_at__isnull=False).exists():
+            return True
+        self.stdout.write(f'{model._meta.verbose_name.capitalize()} {object_id} was restored, skipping it')
+        return False
+
+    def purge_book(self, book_id):
+        """Removes the book and its dependent rows, returns False if it was restored meanwhile"""
+        # Copies of a soft-deleted book are hidden from BookInstance.objects
+        for ids in self.in_batches(BookInstance.all_objects.filter(book_id=book_id)):
+            with transaction.atomic():
+                if not self.still_deleted(Book, book_id):
+                    return False
+                BookInstance.all_objects.filter(pk__in=ids).delete()
+
+        GenreLink = Book.genre.through
+        for ids in self.in_batches(GenreLink.objects.filter(book_id=book_id)):
+            with transaction.atomic():
+                if not self.still_deleted(Book, book_id):
+                    return False
+                GenreLink.objects.filter(pk__in=ids).delete()
+
+        with transaction.atomic():
+            if not self.still_deleted(Book, book_id):
+                return False
+            # The copies and genre links are gone. Its similar-book rows were
+            # replaced when the soft delete refreshed them, so only the rows
+            # of a refresh still queued cascade here, for the pre_delete
+            # receiver to pass on to the neighbours' refresh.
+            Book.all_objects.filter(id=book_id).delete()
+        return True
+
+    def purge_author(self, author_id):
+        """Detaches the author's books and removes the author, returns False if it was restored meanwhile"""
+        for ids in self.in_batches(Book.all_objects.filter(author_id=author_id)):
+            with transaction.atomic():
+                if not self.still_deleted(Author, author_id):
+                    return False
+                Book.all_objects.filter(pk__in=ids).update(author=None)
+
+        with transaction.atomic():
+            if not self.still_deleted(Author, author_id):
+                return False
+            Author.all_objects.filter(id=author_id).delete()
+        return True
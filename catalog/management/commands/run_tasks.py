@@ -0,0 +1,102 @@
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+import multiprocessing
+import os
+import time
+import traceback
+
+from catalog.models import Task
+from catalog.task_queue import claim_tasks, complete_task, queue_stats, requeue_stale_tasks
+from catalog.task_worker import init_worker, run_task_in_worker
+
+
+class Command(BaseCommand):
+    help = (
+        'Runs queued background tasks in a pool of worker processes. Tasks write to the '
+        'cache, so the web processes only see their results with a shared cache backend.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=2,
+                help='Number of worker processes')
+        parser.add_argument('--batch-size', type=int, default=20,
+                help='Number of tasks claimed at a time')
+        parser.add_argument('--interval', type=float, default=1.0,
+                help='Seconds to wait when the queue is empty')
+        parser.add_argument('--visibility-timeout', type=int, default=600,
+                help='Seconds after which a running task is assumed lost and retried')
+        parser.add_argument('--once', action='store_true',
+                help='Exit once no task is due')
+        parser.add_argument('--stats', action='store_true',
+                help='Print the queue depth and exit')
+
+    def handle(self, *args, **options):
+        if options['stats']:
+            self.print_stats()
+            return
+
+        pool = self.create_pool(options['workers'])
+        try:
+            while True:
+                requeued = requeue_stale_tasks(options['visibility_timeout'])
+                if requeued:
+                    self.stderr.write(f'Requeued {requeued} stale task(s)')
+
+                tasks = claim_tasks(options['batch_size'])
+                if not tasks:
+                    if options['once']:
+                        break
+                    time.sleep(options['interval'])
+                    continue
+
+                if not self.run_batch(pool, tasks):
+                    # A worker died, the pool can't run anything else
+                    pool.shutdown(wait=False)
+                    pool = self.create_pool(options['workers'])
+        finally:
+            pool.shutdown()
+
+    def create_pool(self, workers):
+        # Spawned workers set up Django themselves instead of inheriting
+        # this process's open database connection
+        return ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=init_worker,
+            initargs=(os.environ['DJANGO_SETTINGS_MODULE'],),
+        )
+
+    def run_batch(self, pool, tasks):
+        """Runs the tasks and records their outcome, returns False if the pool broke"""
+        pool_ok = True
+        futures = [(task, pool.submit(run_task_in_worker, task.name, task.payload)) for task in tasks]
+        for task, future in futures:
+            try:
+                error = future.result()
+            except BrokenProcessPool:
+                pool_ok = False
+                error = traceback.format_exc()
+            except Exception:
+                error = traceback.format_exc()
+
+            if not complete_task(task, error):
+                status = 'claim expired, result ignored'
+            else:
+                status = 'failed' if error else 'done'
+            self.stdout.write(f'{task.name} [{task.key or "-"}]: {status}')
+        return pool_ok
+
+    def print_stats(self):
+        stats = queue_stats()
+        statuses = dict(Task.TASK_STATUS)
+        for (status, name), count in stats['depth'].items():
+            self.stdout.write(f'{statuses[status]:10} {count:>6}  {name}')
+
+        oldest = stats['oldest_pending']
+        if oldest:
+            self.stdout.write(f'Oldest pending task queued {timezone.now() - oldest} ago')
+        else:
+            self.stdout.write('No pending tasks')
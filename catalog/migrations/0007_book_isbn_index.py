@@ -0,0 +1,19 @@
+# Generated by Django 2.2.28 on 2026-10-19 15:04
+
+import catalog.isbn
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0006_auto_20180822_1612'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='book',
+            name='isbn',
+            field=models.CharField(db_index=True, help_text='10 or 13-character ISBN number', max_length=13, validators=[catalog.isbn.validate_isbn], verbose_name='ISBN'),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 2.2.28 on 2026-10-19 15:08
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0008_soft_delete'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Task',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(help_text='Dotted path of the task function', max_length=255)),
+                ('key', models.CharField(blank=True, help_text='Pending tasks with the same name and key run once', max_length=255)),
+                ('payload', models.TextField(default='{}', help_text='JSON keyword arguments')),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('max_attempts', models.PositiveIntegerField(default=3)),
+                ('run_after', models.DateTimeField(default=django.utils.timezone.now)),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('last_error', models.TextField(blank=True)),
+                ('status', models.CharField(choices=[('p', 'Pending'), ('r', 'Running'), ('f', 'Failed')], default='p', max_length=1)),
+            ],
+            options={
+                'ordering': ['run_after'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['status', 'run_after'], name='catalog_tas_status_49344c_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['name', 'key'], name='catalog_tas_name_986859_idx'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 2.2.28 on 2026-10-19 15:09
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0009_task'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SimilarBook',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.FloatField()),
+                ('book', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='similar_books', to='catalog.Book')),
+                ('similar', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='catalog.Book')),
+            ],
+            options={
+                'ordering': ['-score'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='similarbook',
+            index=models.Index(fields=['book', '-score'], name='catalog_sim_book_id_73a7b4_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='similarbook',
+            unique_together={('book', 'similar')},
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 2.2.28 on 2026-10-19 15:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0010_similarbook'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='book',
+            name='isbn',
+            field=models.CharField(db_index=True, help_text='10 or 13-character ISBN number', max_length=17, verbose_name='ISBN'),
+        ),
+    ]
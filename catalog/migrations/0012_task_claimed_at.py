@@ -0,0 +1,18 @@
+# Generated by Django 2.2.28 on 2026-10-19 15:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0011_book_isbn_length'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='task',
+            name='claimed_at',
+            field=models.DateTimeField(blank=True, help_text='When a worker started running the task', null=True),
+        ),
+    ]
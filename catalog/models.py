@@ -1,23 +1,74 @@
 from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
 from django.db import models
 from django.urls import reverse
+from django.utils import timezone
 
 from datetime import date
 import uuid
 
-class Book(models.Model):
+from catalog.isbn import canonical_isbn, normalize_isbn
+
+class LiveManager(models.Manager):
+    """Manager excluding soft-deleted rows"""
+
+    def get_queryset(self):
+        return super().get_queryset().filter(deleted_at__isnull=True)
+
+
+class LiveBookInstanceManager(models.Manager):
+    """Manager excluding copies of soft-deleted books"""
+
+    def get_queryset(self):
+        return super().get_queryset().filter(book__deleted_at__isnull=True)
+
+
+class SoftDeleteModel(models.Model):
+    """
+    Abstract model for rows which are hidden first and removed later by the
+    purge_deleted command, together with their dependent rows.
+
+    `objects` hides soft-deleted rows, `all_objects` (used by the admin, or
+    `dumpdata --all`) still returns them.
+    """
+
+    # Fields
+    deleted_at = models.DateTimeField(null=True, blank=True, editable=False, db_index=True)
+
+    # Managers
+    objects = LiveManager()
+    all_objects = models.Manager()
+
+    # Metadata
+    class Meta:
+        abstract = True
+
+    # Methods
+    def soft_delete(self):
+        """Hides this row without touching its dependent rows"""
+        self.deleted_at = timezone.now()
+        self.save(update_fields=['deleted_at'])
+
+    def restore(self):
+        """Shows a soft-deleted row again"""
+        self.deleted_at = None
+        self.save(update_fields=['deleted_at'])
+
+
+class Book(SoftDeleteModel):
     """Model representing a Book (but not a specific copy of a book)"""
 
     # Fields
     title = models.CharField(max_length=255)
     author = models.ForeignKey('Author', on_delete=models.SET_NULL, null=True)
     summary = models.TextField(max_length=1000, help_text='Enter a summary of this book')
-    isbn = models.CharField('ISBN', max_length=13, help_text='13-character ISBN number')
+    # Long enough for a hyphenated ISBN-13, stored without hyphens by clean()/save()
+    isbn = models.CharField('ISBN', max_length=17, db_index=True, help_text='10 or 13-character ISBN number')
     genre = models.ManyToManyField('Genre', help_text='Select a genre for this book')
     language = models.ForeignKey('Language', on_delete=models.CASCADE, null=False)
 
     # Metadata
-    class Meta:
+    class Meta(SoftDeleteModel.Meta):
         ordering = ['title']
         permissions = (
             ('can_edit_books', 'Create, update or delete books'),        
@@ -31,6 +82,40 @@ class Book(models.Model):
     def __str__(self):
         return self.title
 
+    @property
+    def current_author(self):
+        """Returns the author, or None once the author is soft-deleted"""
+        if self.author and not self.author.deleted_at:
+            return self.author
+        return None
+
+    def clean(self):
+        """Normalizes the ISBN and rejects books already in the catalog"""
+        # A blank ISBN is already reported by the field validation
+        if not self.isbn:
+            return
+
+        try:
+            self.isbn = normalize_isbn(self.isbn)
+        except ValidationError as error:
+            raise ValidationError({'isbn': error})
+
+        # Soft-deleted books count too, restoring one must not add a duplicate
+        duplicate = Book.all_objects.filter(isbn=self.isbn).exclude(pk=self.pk).first()
+        if duplicate:
+            raise ValidationError({
+                'isbn': ValidationError(
+                    'A book with ISBN %(value)s already exists: %(book)s.',
+                    code='duplicate',
+                    params={'value': self.isbn, 'book': duplicate},
+                ),
+            })
+
+    def save(self, *args, **kwargs):
+        # Store the canonical ISBN-13 so lookups can use the index
+        self.isbn = canonical_isbn(self.isbn) or self.isbn
+        super().save(*args, **kwargs)
+
     def display_genre(self):
         return ', '.join(genre.name for genre in self.genre.all()[:3])
 
@@ -67,7 +152,7 @@ class Language(models.Model):
         return self.name
 
 
-class Author(models.Model):
+class Author(SoftDeleteModel):
     """Model representing an Author"""
 
     # Fields
@@ -77,7 +162,7 @@ class Author(models.Model):
     date_of_death = models.DateField('Died', null=True, blank=True)
 
     # Meta
-    class Meta:
+    class Meta(SoftDeleteModel.Meta):
         ordering = ['last_name', 'first_name']
         permissions = (
                 ('can_edit_authors', 'Create, edit or delete authors'),
@@ -101,6 +186,10 @@ class BookInstance(models.Model):
     imprint = models.CharField(max_length=200)
     borrower = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
 
+    # Managers
+    objects = LiveBookInstanceManager()
+    all_objects = models.Manager()
+
     MAINTENANCE = 'm'
     ON_LOAN = 'o'
     AVAILABLE  = 'a'
@@ -137,3 +226,63 @@ class BookInstance(models.Model):
             return True
         return False
 
+
+
+class SimilarBook(models.Model):
+    """Model representing a precomputed similar book, see catalog/similarity.py"""
+
+    # Fields
+    book = models.ForeignKey(Book, on_delete=models.CASCADE, related_name='similar_books')
+    similar = models.ForeignKey(Book, on_delete=models.CASCADE, related_name='+')
+    score = models.FloatField()
+
+    # Meta
+    class Meta:
+        ordering = ['-score']
+        unique_together = ('book', 'similar')
+        indexes = [
+            models.Index(fields=['book', '-score']),
+        ]
+
+    # Methods
+    def __str__(self):
+        return f'{self.book} ~ {self.similar} ({self.score})'
+
+
+class Task(models.Model):
+    """Model representing a queued background task, see catalog/task_queue.py"""
+
+    # Fields
+    name = models.CharField(max_length=255, help_text='Dotted path of the task function')
+    key = models.CharField(max_length=255, blank=True, help_text='Pending tasks with the same name and key run once')
+    payload = models.TextField(default='{}', help_text='JSON keyword arguments')
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=3)
+    run_after = models.DateTimeField(default=timezone.now)
+    created = models.DateTimeField(auto_now_add=True)
+    last_error = models.TextField(blank=True)
+    claimed_at = models.DateTimeField(null=True, blank=True, help_text='When a worker started running the task')
+
+    PENDING = 'p'
+    RUNNING = 'r'
+    FAILED = 'f'
+
+    TASK_STATUS = (
+        (PENDING, 'Pending'),
+        (RUNNING, 'Running'),
+        (FAILED, 'Failed'),
+    )
+
+    status = models.CharField(max_length=1, choices=TASK_STATUS, default=PENDING)
+
+    # Meta
+    class Meta:
+        ordering = ['run_after']
+        indexes = [
+            models.Index(fields=['status', 'run_after']),
+            models.Index(fields=['name', 'key']),
+        ]
+
+    # Methods
+    def __str__(self):
+        return f'{self.name} ({self.get_status_display()})'
@@ -0,0 +1,181 @@
+from django.contrib.auth.models import Group, Permission, User
+from django.db import transaction
+from django.db.models import Q
+from django.db.models.signals import m2m_changed, post_delete, post_init, post_save, pre_delete
+from django.dispatch import receiver
+
+from catalog.autocomplete import AUTHOR, BOOK, autocomplete_index
+from catalog.backends import invalidate_all_permissions, invalidate_user_permissions
+from catalog.loans import invalidate_user_loans
+from catalog.models import Author, Book, BookInstance, SimilarBook
+from catalog.similarity import refresh_similar_books
+from catalog.task_queue import enqueue
+from catalog.tasks import refresh_catalog_stats
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+@receiver(m2m_changed, sender=User.user_permissions.through)
+def user_permissions_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """Invalidates cached permissions when a user's groups or permissions change"""
+    if not action.startswith('post_'):
+        return
+
+    # Invalidate after the commit, or a concurrent request could cache the
+    # old permissions again before the change is visible
+    if not reverse:
+        user_id = instance.pk
+        transaction.on_commit(lambda: invalidate_user_permissions(user_id))
+    elif action == 'post_clear' or not pk_set:
+        # Clearing from the group/permission side doesn't report the users
+        transaction.on_commit(invalidate_all_permissions)
+    else:
+        user_ids = set(pk_set)
+        transaction.on_commit(lambda: invalidate_user_permissions(*user_ids))
+
+
+@receiver(m2m_changed, sender=Group.permissions.through)
+def group_permissions_changed(sender, action, **kwargs):
+    if action.startswith('post_'):
+        transaction.on_commit(invalidate_all_permissions)
+
+
+@receiver(post_delete, sender=Group)
+@receiver(post_delete, sender=Permission)
+def permission_source_deleted(sender, **kwargs):
+    transaction.on_commit(invalidate_all_permissions)
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, created, **kwargs):
+    # Active and superuser flags decide which permissions are loaded
+    if not created:
+        user_id = instance.pk
+        transaction.on_commit(lambda: invalidate_user_permissions(user_id))
+
+
+@receiver(post_save, sender=Book)
+def book_saved(sender, instance, **kwargs):
+    if instance.deleted_at:
+        book_deleted(sender, instance)
+    else:
+        transaction.on_commit(lambda: autocomplete_index.update_book(instance))
+
+
+@receiver(post_delete, sender=Book)
+def book_deleted(sender, instance, **kwargs):
+    book_id = instance.id
+    transaction.on_commit(lambda: autocomplete_index.remove_object(BOOK, book_id))
+
+
+@receiver(post_save, sender=Author)
+def author_saved(sender, instance, **kwargs):
+    if instance.deleted_at:
+        author_deleted(sender, instance)
+    else:
+        transaction.on_commit(lambda: autocomplete_index.update_author(instance))
+
+
+@receiver(post_delete, sender=Author)
+def author_deleted(sender, instance, **kwargs):
+    author_id = instance.id
+    transaction.on_commit(lambda: autocomplete_index.remove_object(AUTHOR, author_id))
+
+
+@receiver(post_init, sender=BookInstance)
+def bookinstance_loaded(sender, instance, **kwargs):
+    # Remember the borrower so returning a book also clears their loans,
+    # and the status which the home page counts depend on.
+    # Read from __dict__ so deferred loads don't fetch the fields.
+    instance._loaded_borrower_id = instance.__dict__.get('borrower_id')
+    instance._loaded_status = instance.__dict__.get('status')
+
+
+@receiver(post_save, sender=BookInstance)
+@receiver(post_delete, sender=BookInstance)
+def bookinstance_changed(sender, instance, **kwargs):
+    user_ids = {getattr(instance, '_loaded_borrower_id', None), instance.borrower_id}
+    instance._loaded_borrower_id = instance.borrower_id
+    transaction.on_commit(lambda: invalidate_user_loans(*user_ids))
+
+
+def invalidate_borrowers_loans(copies):
+    """Clears the cached loans of the users borrowing any of the given copies once the change commits"""
+    user_ids = set(copies.filter(borrower__isnull=False).values_list('borrower_id', flat=True))
+    if user_ids:
+        transaction.on_commit(lambda: invalidate_user_loans(*user_ids))
+
+
+# Cached loans show the book's title and author. Deleting a book deletes its
+# copies, whose own signals clear their borrowers' loans.
+@receiver(post_save, sender=Book)
+def loaned_book_saved(sender, instance, created, **kwargs):
+    if not created:
+        invalidate_borrowers_loans(BookInstance.all_objects.filter(book=instance))
+
+
+@receiver(post_save, sender=Author)
+@receiver(pre_delete, sender=Author)
+def loaned_author_changed(sender, instance, **kwargs):
+    # pre_delete, as the books are detached from the author without signals
+    if not kwargs.get('created'):
+        invalidate_borrowers_loans(BookInstance.all_objects.filter(book__author=instance))
+
+
+def enqueue_catalog_stats():
+    # Same-key tasks collapse, so a burst of writes recomputes the counts once
+    enqueue(refresh_catalog_stats, key='catalog-stats')
+
+
+@receiver(post_save, sender=Book)
+@receiver(post_save, sender=Author)
+def counted_object_saved(sender, created, update_fields, **kwargs):
+    # Only additions, soft deletes and restores change the counts
+    if created or (update_fields and 'deleted_at' in update_fields):
+        enqueue_catalog_stats()
+
+
+@receiver(post_save, sender=BookInstance)
+def counted_copy_saved(sender, instance, created, **kwargs):
+    if created or instance.status != getattr(instance, '_loaded_status', None):
+        enqueue_catalog_stats()
+    instance._loaded_status = instance.status
+
+
+@receiver(post_delete, sender=Book)
+@receiver(post_delete, sender=Author)
+@receiver(post_delete, sender=BookInstance)
+def counted_object_deleted(sender, **kwargs):
+    enqueue_catalog_stats()
+
+
+@receiver(pre_delete, sender=Book)
+def book_similarity_deleting(sender, instance, **kwargs):
+    # The cascade removes the rows linking the book to its neighbours before the task runs
+    rows = SimilarBook.objects.filter(Q(book_id=instance.id) | Q(similar_id=instance.id))
+    instance._similar_affected_ids = sorted(
+        {book_id for pair in rows.values_list('book_id', 'similar_id') for book_id in pair} - {instance.id}
+    )
+
+
+@receiver(post_save, sender=Book)
+def book_similarity_changed(sender, instance, **kwargs):
+    enqueue(refresh_similar_books, key=str(instance.id), book_id=instance.id)
+
+
+@receiver(post_delete, sender=Book)
+def book_similarity_deleted(sender, instance, **kwargs):
+    # Own key, so a pending refresh from an earlier save doesn't swallow the affected ids
+    enqueue(
+        refresh_similar_books, key=f'deleted-{instance.id}', book_id=instance.id,
+        affected_ids=getattr(instance, '_similar_affected_ids', []),
+    )
+
+
+@receiver(m2m_changed, sender=Book.genre.through)
+def book_genres_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if not action.startswith('post_'):
+        return
+
+    book_ids = pk_set if reverse else [instance.id]
+    for book_id in book_ids or ():
+        enqueue(refresh_similar_books, key=str(book_id), book_id=book_id)
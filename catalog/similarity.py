@@ -0,0 +1,227 @@
+from collections import defaultdict
+from django.db import transaction
+from django.db.models import Case, Count, IntegerField, Q, Value, When
+from operator import itemgetter
+
+import heapq
+import itertools
+
+from catalog.models import Book, SimilarBook
+
+# Score contributed by each shared genre, a shared author and a shared language
+GENRE_WEIGHT = 1.0
+AUTHOR_WEIGHT = 2.0
+LANGUAGE_WEIGHT = 0.5
+
+# Number of similar books kept per book
+TOP_N = 10
+
+# Upper bound on the genre/language combinations compared with each book
+# during a full build. The book's smallest genres are compared first, so
+# the cap only drops combinations reached through its broadest genres.
+MAX_CANDIDATE_GROUPS = 1000
+
+
+def _top_similar(book_id, books, genres_by_book, candidates):
+    """
+    Returns the TOP_N (score, similar_id) pairs for `book_id` among the
+    candidates. `books` maps ids to (author_id, language_id) and
+    `genres_by_book` maps ids to sets of genre ids.
+    """
+    author_id, language_id = books[book_id]
+    genres = genres_by_book.get(book_id, set())
+
+    scores = []
+    for other in candidates:
+        if other == book_id or other not in books:
+            continue
+        other_author_id, other_language_id = books[other]
+        shared_genres = len(genres & genres_by_book.get(other, set()))
+        same_author = author_id is not None and other_author_id == author_id
+        if not shared_genres and not same_author:
+            continue
+
+        score = shared_genres * GENRE_WEIGHT
+        if same_author:
+            score += AUTHOR_WEIGHT
+        if other_language_id == language_id:
+            score += LANGUAGE_WEIGHT
+        scores.append((score, other))
+
+    scores.sort(key=lambda pair: (-pair[0], pair[1]))
+    return scores[:TOP_N]
+
+
+def _ranked_ids(genres, language_id, groups, limit):
+    """
+    Returns the first `limit` ids of the books in `groups`, a list of
+    ((genres, language_id), sorted ids) pairs, ranked by the number of genres
+    shared with `genres`, then the same language first, then by id.
+    """
+    ranked = sorted(
+        (((-len(genres & other_genres), other_language_id != language_id), ids)
+         for (other_genres, other_language_id), ids in groups),
+        key=itemgetter(0),
+    )
+
+    result = []
+    for rank, level in itertools.groupby(ranked, key=itemgetter(0)):
+        result.extend(itertools.islice(heapq.merge(*(ids for rank, ids in level)), limit - len(result)))
+        if len(result) >= limit:
+            break
+    return result
+
+
+def _save_similar(similar_by_book):
+    """Replaces the stored similar books of each book in the mapping"""
+    with transaction.atomic():
+        SimilarBook.objects.filter(book_id__in=list(similar_by_book)).delete()
+        SimilarBook.objects.bulk_create(
+            SimilarBook(book_id=book, similar_id=other, score=score)
+            for book, similar in similar_by_book.items()
+            for score, other in similar
+        )
+
+
+def build_similar_books(batch_size=500):
+    """
+    Rebuilds the whole similarity table.
+
+    Books with the same genres and language rank every other book the same
+    way, so the ranking is done once per such group: the groups sharing a
+    genre with it are ordered by the number of shared genres, and only the
+    first books of the best groups are scored along with the author's books.
+    """
+    books = {
+        book_id: (author_id, language_id)
+        for book_id, author_id, language_id in Book.objects.values_list('id', 'author_id', 'language_id').iterator()
+    }
+
+    genres_by_book = defaultdict(set)
+    for book_id, genre_id in Book.genre.through.objects.values_list('book_id', 'genre_id').iterator():
+        if book_id in books:
+            genres_by_book[book_id].add(genre_id)
+
+    groups = defaultdict(list)
+    groups_by_author = defaultdict(lambda: defaultdict(list))
+    for book_id in sorted(books):
+        author_id, language_id = books[book_id]
+        group = (frozenset(genres_by_book[book_id]), language_id)
+        groups[group].append(book_id)
+        if author_id is not None:
+            groups_by_author[author_id][group].append(book_id)
+
+    groups_by_genre = defaultdict(list)
+    for group in groups:
+        for genre_id in group[0]:
+            groups_by_genre[genre_id].append(group)
+
+    # One more than TOP_N, as a book's own group may rank it first
+    limit = TOP_N + 1
+    batch = {}
+    for (genres, language_id), group_book_ids in groups.items():
+        # Rarer genres say more about a book, compare their groups first
+        candidate_groups = {}
+        for genre_id in sorted(genres, key=lambda genre_id: len(groups_by_genre[genre_id])):
+            for group in groups_by_genre[genre_id]:
+                candidate_groups.setdefault(group, groups[group])
+                if len(candidate_groups) >= MAX_CANDIDATE_GROUPS:
+                    break
+            if len(candidate_groups) >= MAX_CANDIDATE_GROUPS:
+                break
+        genre_candidates = _ranked_ids(genres, language_id, candidate_groups.items(), limit)
+
+        for book_id in group_book_ids:
+            candidates = set(genre_candidates)
+            author_id = books[book_id][0]
+            if author_id is not None:
+                candidates.update(_ranked_ids(genres, language_id, groups_by_author[author_id].items(), limit))
+
+            batch[book_id] = _top_similar(book_id, books, genres_by_book, candidates)
+            if len(batch) >= batch_size:
+                _save_similar(batch)
+                batch = {}
+
+    # Soft-deleted books lose their rows too
+    SimilarBook.objects.exclude(book_id__in=Book.objects.values('id')).delete()
+    if batch:
+        _save_similar(batch)
+    return len(books)
+
+
+def _compute_similar(book_id):
+    """
+    Returns the TOP_N (score, similar_id) pairs for one book, read from the
+    database with the ranking used by build_similar_books
+    """
+    book = Book.objects.filter(id=book_id).values_list('author_id', 'language_id').first()
+    if book is None:
+        return []
+    author_id, language_id = book
+
+    GenreLink = Book.genre.through
+    genre_ids = list(GenreLink.objects.filter(book_id=book_id).values_list('genre_id', flat=True))
+    limit = TOP_N + 1
+
+    # Co-occurrence counts of the book's genres, best matches first
+    genre_candidates = (
+        GenreLink.objects
+        .filter(genre_id__in=genre_ids, book__deleted_at__isnull=True)
+        .values('book_id')
+        .annotate(
+            shared=Count('id'),
+            same_language=Case(When(book__language_id=language_id, then=Value(1)), default=Value(0),
+                               output_field=IntegerField()),
+        )
+        .order_by('-shared', '-same_language', 'book_id')
+        .values_list('book_id', flat=True)
+    )
+    candidates = set(genre_candidates[:limit])
+
+    if author_id is not None:
+        author_candidates = (
+            Book.objects
+            .filter(author_id=author_id)
+            .annotate(
+                shared=Count('genre', filter=Q(genre__in=genre_ids)),
+                same_language=Case(When(language_id=language_id, then=Value(1)), default=Value(0),
+                                   output_field=IntegerField()),
+            )
+            .order_by('-shared', '-same_language', 'id')
+            .values_list('id', flat=True)
+        )
+        candidates.update(author_candidates[:limit])
+
+    candidates.add(book_id)
+    books = {
+        candidate_id: (candidate_author_id, candidate_language_id)
+        for candidate_id, candidate_author_id, candidate_language_id
+        in Book.objects.filter(id__in=candidates).values_list('id', 'author_id', 'language_id')
+    }
+    genres_by_book = defaultdict(set)
+    for candidate_id, genre_id in GenreLink.objects.filter(book_id__in=candidates).values_list('book_id', 'genre_id'):
+        genres_by_book[candidate_id].add(genre_id)
+
+    return _top_similar(book_id, books, genres_by_book, candidates)
+
+
+def refresh_similar_books(book_id, affected_ids=()):
+    """
+    Recomputes the similar books of one book after its genres, author or
+    language changed, along with the books it was or now is similar to.
+    `affected_ids` lists neighbours whose rows were already removed, e.g. by
+    the cascade when the book was deleted. Other books may keep a slightly
+    stale list until the next full build.
+    """
+    similar_by_book = {book_id: _compute_similar(book_id)}
+
+    affected = set(affected_ids)
+    affected.update(other for score, other in similar_by_book[book_id])
+    affected.update(SimilarBook.objects.filter(book_id=book_id).values_list('similar_id', flat=True))
+    affected.update(SimilarBook.objects.filter(similar_id=book_id).values_list('book_id', flat=True))
+    affected.discard(book_id)
+
+    for affected_id in affected:
+        similar_by_book[affected_id] = _compute_similar(affected_id)
+
+    _save_similar(similar_by_book)
@@ -0,0 +1,103 @@
+from django.db import transaction
+from django.db.models import Count, Min
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+import datetime
+import json
+
+from catalog.models import Task
+
+# Seconds before the first retry, doubled after each failed attempt
+RETRY_DELAY = 30
+
+
+def task_name(func):
+    return f'{func.__module__}.{func.__name__}'
+
+
+def enqueue(func, key='', **kwargs):
+    """
+    Queues func(**kwargs) to run in the run_tasks worker once the current
+    transaction commits. A task with a key is skipped if the same task and
+    key is already pending, so bursts of writes collapse into one run.
+    """
+    name = task_name(func)
+    payload = json.dumps(kwargs, sort_keys=True)
+
+    def create_task():
+        if key and Task.objects.filter(name=name, key=key, status=Task.PENDING).exists():
+            return
+        Task.objects.create(name=name, key=key, payload=payload)
+
+    transaction.on_commit(create_task)
+
+
+def claim_tasks(limit):
+    """Marks up to `limit` due tasks as running and returns them"""
+    due_ids = Task.objects.filter(status=Task.PENDING, run_after__lte=timezone.now()).values_list('id', flat=True)[:limit]
+
+    claimed = []
+    for task_id in due_ids:
+        # Another worker may have claimed the task in the meantime
+        if Task.objects.filter(id=task_id, status=Task.PENDING).update(status=Task.RUNNING, claimed_at=timezone.now()):
+            claimed.append(task_id)
+    return list(Task.objects.filter(id__in=claimed))
+
+
+def requeue_stale_tasks(timeout):
+    """
+    Counts tasks running for more than `timeout` seconds as failed attempts,
+    e.g. after their worker was killed, so they are retried or marked failed.
+    """
+    cutoff = timezone.now() - datetime.timedelta(seconds=timeout)
+    stale_tasks = Task.objects.filter(status=Task.RUNNING, claimed_at__lt=cutoff)
+    # A task finished meanwhile is skipped by complete_task
+    return sum(
+        complete_task(task, f'Still running after {timeout} seconds, the worker was probably lost')
+        for task in stale_tasks
+    )
+
+
+def run_task(name, payload):
+    """Runs a task function, in a worker process"""
+    import_string(name)(**json.loads(payload))
+
+
+def complete_task(task, error=None):
+    """
+    Removes a finished task, or schedules a retry if it failed.
+
+    Returns False and changes nothing if the claim has expired meanwhile,
+    i.e. requeue_stale_tasks gave the task to another run.
+    """
+    # Only the run holding the current claim may finish the task
+    claimed = Task.objects.filter(id=task.id, claimed_at=task.claimed_at)
+    if error is None:
+        deleted, _ = claimed.delete()
+        return bool(deleted)
+
+    task.attempts += 1
+    task.last_error = error
+    task.claimed_at = None
+    if task.attempts < task.max_attempts:
+        task.status = Task.PENDING
+        task.run_after = timezone.now() + datetime.timedelta(seconds=RETRY_DELAY * 2 ** (task.attempts - 1))
+    else:
+        task.status = Task.FAILED
+    return bool(claimed.update(
+        attempts=task.attempts, last_error=task.last_error, claimed_at=None,
+        status=task.status, run_after=task.run_after,
+    ))
+
+
+def queue_stats():
+    """Returns the queue depth per status and task name, and the oldest due task"""
+    stats = {
+        'depth': {
+            (row['status'], row['name']): row['count']
+            for row in Task.objects.values('status', 'name').annotate(count=Count('id')).order_by('status', 'name')
+        },
+        'oldest_pending': Task.objects.filter(status=Task.PENDING).aggregate(oldest=Min('created'))['oldest'],
+    }
+    return stats
@@ -0,0 +1,28 @@
+# catalog/task_worker.py
+# Runs in the run_tasks worker processes. They are started with the spawn
+# method, so they share no database connection with the parent; this module
+# must not import models before init_worker() has set up Django.
+
+import os
+import traceback
+
+
+def init_worker(settings_module):
+    """Process pool initializer setting up Django in a fresh worker"""
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', settings_module)
+
+    import django
+    django.setup()
+
+
+def run_task_in_worker(name, payload):
+    """Runs the task and returns the formatted traceback if it fails"""
+    from django.db import connections
+    from catalog.task_queue import run_task
+
+    try:
+        run_task(name, payload)
+    except Exception:
+        return traceback.format_exc()
+    finally:
+        connections.close_all()
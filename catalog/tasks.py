@@ -0,0 +1,29 @@
+from django.core.cache import cache
+
+from catalog.models import Author, Book, BookInstance
+
+# Cache key of the counts shown on the home page
+CATALOG_STATS_KEY = 'catalog:stats'
+
+# Counts expire on their own in case no run_tasks worker is running
+CATALOG_STATS_TIMEOUT = 60 * 10
+
+
+def get_catalog_stats():
+    """Returns the record counts shown on the home page, computing them if needed"""
+    stats = cache.get(CATALOG_STATS_KEY)
+    if stats is None:
+        stats = refresh_catalog_stats()
+    return stats
+
+
+def refresh_catalog_stats():
+    """Recomputes the home page record counts"""
+    stats = {
+        'num_books': Book.objects.all().count(),
+        'num_instances': BookInstance.objects.all().count(),
+        'num_instances_available': BookInstance.objects.filter(status__exact=BookInstance.AVAILABLE).count(),
+        'num_authors': Author.objects.all().count(),
+    }
+    cache.set(CATALOG_STATS_KEY, stats, CATALOG_STATS_TIMEOUT)
+    return stats
@@ -1,3 +1,592 @@
-from django.test import TestCase
+from django.contrib import admin
+from django.contrib.auth.models import Group, Permission, User
+from django.core.management import call_command
+from django.core.checks import run_checks
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.forms import modelform_factory
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
 
-# Create your tests here.
+import datetime
+import json
+import threading
+from io import StringIO
+from unittest import mock
+
+from catalog.autocomplete import VERSION_KEY, CatalogAutocomplete, PrefixIndex
+from catalog.checks import check_shared_cache
+from catalog.isbn import canonical_isbn, normalize_isbn
+from catalog.loans import get_user_loans, group_loans
+from catalog.management.commands.purge_deleted import Command as PurgeDeletedCommand
+from catalog.models import Author, Book, BookInstance, Genre, Language, SimilarBook, Task
+from catalog.similarity import _compute_similar, build_similar_books, refresh_similar_books
+from catalog.task_queue import RETRY_DELAY, claim_tasks, complete_task, enqueue, requeue_stale_tasks
+from catalog.tasks import refresh_catalog_stats
+
+
+class NormalizeIsbnTest(TestCase):
+    def test_isbn10_is_converted_to_isbn13(self):
+        self.assertEqual(normalize_isbn('0306406152'), '9780306406157')
+
+    def test_isbn10_with_x_check_digit(self):
+        self.assertEqual(normalize_isbn('080442957X'), '9780804429573')
+        self.assertEqual(normalize_isbn('080442957x'), '9780804429573')
+
+    def test_isbn13_is_kept(self):
+        self.assertEqual(normalize_isbn('9780306406157'), '9780306406157')
+
+    def test_separators_are_ignored(self):
+        self.assertEqual(normalize_isbn('978-0-306-40615-7'), '9780306406157')
+        self.assertEqual(normalize_isbn('0 306 40615 2'), '9780306406157')
+
+    def test_wrong_check_digit_is_rejected(self):
+        with self.assertRaises(ValidationError):
+            normalize_isbn('0306406153')
+        with self.assertRaises(ValidationError):
+            normalize_isbn('9780306406158')
+
+    def test_malformed_isbn_is_rejected(self):
+        for value in ['', '123', '030640615X2', '1230306406157', '97803064061A7']:
+            with self.subTest(value=value), self.assertRaises(ValidationError):
+                normalize_isbn(value)
+
+    def test_canonical_isbn_returns_none_when_invalid(self):
+        self.assertIsNone(canonical_isbn('0306406153'))
+        self.assertEqual(canonical_isbn('0-306-40615-2'), '9780306406157')
+
+
+class BookIsbnFormTest(TestCase):
+    def setUp(self):
+        self.language = Language.objects.create(name='English')
+        self.genre = Genre.objects.create(name='Fantasy')
+        self.author = Author.objects.create(first_name='John', last_name='Tolkien')
+        self.BookForm = modelform_factory(Book, fields='__all__')
+
+    def form_data(self, isbn):
+        return {
+            'title': 'The Hobbit',
+            'author': self.author.id,
+            'summary': 'There and back again',
+            'isbn': isbn,
+            'genre': [self.genre.id],
+            'language': self.language.id,
+        }
+
+    def test_hyphenated_isbn13_is_accepted_and_normalized(self):
+        form = self.BookForm(self.form_data('978-0-306-40615-7'))
+        self.assertTrue(form.is_valid(), form.errors)
+        self.assertEqual(form.save().isbn, '9780306406157')
+
+    def test_invalid_isbn_is_reported_once(self):
+        form = self.BookForm(self.form_data('0306406153'))
+        self.assertFalse(form.is_valid())
+        self.assertEqual(len(form.errors['isbn']), 1)
+
+    def test_duplicate_isbn_is_rejected(self):
+        self.BookForm(self.form_data('0306406152')).save()
+        form = self.BookForm(self.form_data('978-0-306-40615-7'))
+        self.assertFalse(form.is_valid())
+        self.assertTrue(form.errors['isbn'][0].startswith('A book with ISBN 9780306406157'))
+
+    def test_isbn_of_soft_deleted_book_is_taken(self):
+        self.BookForm(self.form_data('0306406152')).save().soft_delete()
+        form = self.BookForm(self.form_data('9780306406157'))
+        self.assertFalse(form.is_valid())
+
+
+class DedupeBooksTest(TestCase):
+    def setUp(self):
+        self.language = Language.objects.create(name='English')
+        self.fantasy = Genre.objects.create(name='Fantasy')
+        self.classics = Genre.objects.create(name='Classics')
+        self.first = self.create_book('0306406152', self.fantasy)
+        self.second = self.create_book('978-0-306-40615-7', self.classics)
+        self.copy = BookInstance.objects.create(book=self.second, imprint='Second edition')
+
+    def create_book(self, isbn, genre):
+        book = Book.objects.create(title='The Hobbit', summary='', isbn='', language=self.language)
+        book.genre.add(genre)
+        # Store the ISBN as entered before ISBNs were normalized
+        Book.objects.filter(id=book.id).update(isbn=isbn)
+        return book
+
+    def dedupe(self, *args):
+        out = StringIO()
+        call_command('dedupe_books', *args, stdout=out, stderr=StringIO())
+        return out.getvalue()
+
+    def test_isbns_are_normalized(self):
+        Book.objects.filter(id=self.second.id).update(isbn='9780141439518')
+        self.dedupe()
+        self.assertEqual(
+            list(Book.objects.order_by('id').values_list('isbn', flat=True)),
+            ['9780306406157', '9780141439518'],
+        )
+
+    def test_duplicates_are_merged_into_the_oldest_book(self):
+        output = self.dedupe()
+
+        self.assertIn('Merged 1 duplicate book(s)', output)
+        self.assertEqual(list(Book.all_objects.values_list('id', flat=True)), [self.first.id])
+        self.copy.refresh_from_db()
+        self.assertEqual(self.copy.book_id, self.first.id)
+        self.assertEqual(set(self.first.genre.all()), {self.fantasy, self.classics})
+
+    def test_soft_deleted_duplicates_are_merged_into_the_live_book(self):
+        self.first.soft_delete()
+        self.dedupe()
+        self.assertEqual(list(Book.all_objects.values_list('id', flat=True)), [self.second.id])
+
+    def test_dry_run_groups_on_canonical_isbns_without_changes(self):
+        output = self.dedupe('--dry-run')
+
+        self.assertIn('Would merge 1 duplicate book(s)', output)
+        self.assertEqual(Book.objects.count(), 2)
+        self.second.refresh_from_db()
+        self.assertEqual(self.second.isbn, '978-0-306-40615-7')
+
+
+class CachedPermissionBackendTest(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('librarian', password='secret')
+        self.group = Group.objects.create(name='Librarians')
+        self.user.groups.add(self.group)
+        self.permission = Permission.objects.get(codename='can_mark_returned')
+
+    def has_perm(self):
+        # A fresh instance, as on the next request
+        return User.objects.get(pk=self.user.pk).has_perm('catalog.can_mark_returned')
+
+    def test_permissions_are_cached(self):
+        self.has_perm()
+        user = User.objects.get(pk=self.user.pk)
+        with self.assertNumQueries(1):
+            user.has_perm('catalog.can_mark_returned')
+
+    def test_group_permission_change_invalidates_cache(self):
+        self.assertFalse(self.has_perm())
+        self.group.permissions.add(self.permission)
+        self.assertTrue(self.has_perm())
+        self.group.permissions.remove(self.permission)
+        self.assertFalse(self.has_perm())
+
+    def test_user_group_change_invalidates_cache(self):
+        self.group.permissions.add(self.permission)
+        self.assertTrue(self.has_perm())
+        self.group.user_set.remove(self.user)
+        self.assertFalse(self.has_perm())
+
+    def test_cache_is_invalidated_after_commit(self):
+        self.group.permissions.add(self.permission)
+        self.assertTrue(self.has_perm())
+        with transaction.atomic():
+            self.group.permissions.remove(self.permission)
+            # Not dropped yet, another request could reload the committed permissions
+            self.assertTrue(self.has_perm())
+        self.assertFalse(self.has_perm())
+
+    @override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+    def test_process_local_cache_is_reported(self):
+        self.assertEqual([warning.id for warning in check_shared_cache(None)], ['catalog.W001'])
+
+
+class PrefixIndexTest(TestCase):
+    def test_search_returns_prefix_matches_in_order(self):
+        index = PrefixIndex()
+        index.load([
+            ('book', 1, ['The Hobbit'], 'The Hobbit'),
+            ('book', 2, ['The Two Towers'], 'The Two Towers'),
+            ('author', 1, ['Tolkien', 'John'], 'Tolkien, John'),
+        ])
+        self.assertEqual(index.search('the t'), [('book', 2, 'The Two Towers')])
+        self.assertEqual(index.search('T', limit=2), [('book', 1, 'The Hobbit'), ('book', 2, 'The Two Towers')])
+        self.assertEqual(index.search('to', kind='author'), [('author', 1, 'Tolkien, John')])
+
+    def test_add_replaces_and_remove_drops_entries(self):
+        index = PrefixIndex()
+        index.add('book', 1, ['The Hobbit'], 'The Hobbit')
+        index.add('book', 1, ['Hobbit, The'], 'Hobbit, The')
+        self.assertEqual(index.search('the'), [])
+        index.remove('book', 1)
+        self.assertEqual(len(index), 0)
+
+    def test_load_stops_at_max_entries(self):
+        index = PrefixIndex(max_entries=2)
+        with self.assertLogs('catalog.autocomplete', 'WARNING'):
+            index.load([('book', i, [f'Title {i}'], f'Title {i}') for i in range(5)])
+        self.assertEqual(len(index), 2)
+
+
+class CatalogAutocompleteTest(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.language = Language.objects.create(name='English')
+
+    def test_changes_from_other_processes_trigger_a_background_rebuild(self):
+        index = CatalogAutocomplete()
+        self.assertEqual(index.search('hob'), [])
+
+        # Saved by another process, which only bumps the shared version
+        book = Book.all_objects.create(title='The Hobbit', summary='', isbn='9780306406157', language=self.language)
+        cache.set(VERSION_KEY, 1, None)
+        index._checked_at = 0
+        released = threading.Event()
+
+        def slow_rebuild(version):
+            released.wait()
+            CatalogAutocomplete.rebuild(index, version)
+
+        with mock.patch.object(index, 'rebuild', slow_rebuild):
+            # Answered from the current index while the rebuild runs
+            self.assertEqual(index.search('the h'), [])
+            released.set()
+            index._rebuild_thread.join()
+
+        self.assertEqual(index.search('the h'), [('book', book.id, 'The Hobbit')])
+
+
+class UserLoansTest(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('reader', password='secret')
+        language = Language.objects.create(name='English')
+        self.author = Author.objects.create(first_name='John', last_name='Tolkien')
+        self.book = Book.objects.create(
+            title='The Hobbit', author=self.author, summary='', isbn='9780306406157', language=language)
+
+        today = datetime.date.today()
+        for days in (-3, 2, 20):
+            BookInstance.objects.create(
+                book=self.book, imprint='First edition', status=BookInstance.ON_LOAN,
+                borrower=self.user, due_back=today + datetime.timedelta(days=days))
+
+    def test_loans_are_grouped_by_due_date(self):
+        buckets = {bucket: len(loans) for bucket, label, loans in group_loans(get_user_loans(self.user))}
+        self.assertEqual(buckets, {'overdue': 1, 'due_this_week': 1, 'later': 1})
+
+    def test_loans_page_and_json(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('loaned-books-by-user'))
+        self.assertContains(response, 'The Hobbit', count=3)
+        self.assertContains(response, 'Overdue')
+
+        data = self.client.get(reverse('loaned-books-by-user-json')).json()
+        self.assertEqual(data['overdue'][0]['author'], 'Tolkien, John')
+
+    def test_loans_are_cached(self):
+        get_user_loans(self.user)
+        with self.assertNumQueries(1):
+            get_user_loans(self.user)
+
+    def test_return_invalidates_cached_loans(self):
+        get_user_loans(self.user)
+        copy = BookInstance.objects.filter(borrower=self.user).first()
+        copy.borrower = None
+        copy.status = BookInstance.AVAILABLE
+        copy.save()
+        self.assertEqual(len(get_user_loans(self.user)), 2)
+
+    def test_book_and_author_changes_invalidate_cached_loans(self):
+        get_user_loans(self.user)
+        self.book.title = 'The Hobbit, or There and Back Again'
+        self.book.save()
+        self.author.first_name = 'J. R. R.'
+        self.author.save()
+
+        loan = get_user_loans(self.user)[0]
+        self.assertEqual(loan['title'], 'The Hobbit, or There and Back Again')
+        self.assertEqual(loan['author'], 'Tolkien, J. R. R.')
+
+    def test_author_delete_invalidates_cached_loans(self):
+        get_user_loans(self.user)
+        self.author.delete()
+        self.assertIsNone(get_user_loans(self.user)[0]['author'])
+
+    def test_unrelated_changes_keep_cached_loans(self):
+        get_user_loans(self.user)
+        other = Book.objects.create(
+            title='Dracula', summary='', isbn='9780141439846', language=self.book.language)
+        other.title = 'Dracula (Penguin Classics)'
+        other.save()
+        with self.assertNumQueries(1):
+            get_user_loans(self.user)
+
+
+class SoftDeleteTest(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_superuser('admin', 'admin@example.com', 'secret')
+        language = Language.objects.create(name='English')
+        self.author = Author.objects.create(first_name='John', last_name='Tolkien')
+        self.book = Book.objects.create(
+            title='The Hobbit', author=self.author, summary='', isbn='9780306406157', language=language)
+        self.copy = BookInstance.objects.create(
+            book=self.book, imprint='First edition', status=BookInstance.ON_LOAN,
+            borrower=self.user, due_back=datetime.date.today())
+        self.client.force_login(self.user)
+
+    def test_soft_deleted_author_is_not_shown(self):
+        self.author.soft_delete()
+        book = Book.objects.get(pk=self.book.pk)
+        self.assertIsNone(book.current_author)
+        self.assertNotContains(self.client.get(book.get_absolute_url()), 'Tolkien')
+
+    def test_copies_of_soft_deleted_book_are_hidden(self):
+        self.assertEqual(len(get_user_loans(self.user)), 1)
+        self.book.soft_delete()
+
+        self.assertFalse(BookInstance.objects.exists())
+        self.assertTrue(BookInstance.all_objects.exists())
+        self.assertEqual(get_user_loans(self.user), [])
+        self.assertNotContains(self.client.get(reverse('loaned-books')), 'The Hobbit')
+
+        stats = refresh_catalog_stats()
+        self.assertEqual((stats['num_books'], stats['num_instances']), (0, 0))
+
+    def test_admin_soft_deletes_and_lists_deleted_rows(self):
+        url = reverse('admin:catalog_book_delete', args=[self.book.pk])
+        self.client.post(url, {'post': 'yes'})
+
+        self.assertTrue(Book.all_objects.get(pk=self.book.pk).deleted_at)
+        self.assertTrue(BookInstance.all_objects.filter(pk=self.copy.pk).exists())
+        self.assertContains(self.client.get(reverse('admin:catalog_book_changelist')), 'The Hobbit')
+
+    def test_admin_restore_action(self):
+        self.book.soft_delete()
+        self.client.post(reverse('admin:catalog_book_changelist'), {
+            'action': 'restore_selected',
+            '_selected_action': [self.book.pk],
+        })
+        self.assertTrue(Book.objects.filter(pk=self.book.pk).exists())
+
+
+class PurgeDeletedTest(TestCase):
+    def setUp(self):
+        language = Language.objects.create(name='English')
+        self.author = Author.objects.create(first_name='John', last_name='Tolkien')
+        self.book = Book.objects.create(
+            title='The Hobbit', author=self.author, summary='', isbn='9780306406157', language=language)
+        self.book.genre.add(Genre.objects.create(name='Fantasy'), Genre.objects.create(name='Classics'))
+        for i in range(3):
+            BookInstance.objects.create(book=self.book, imprint=f'Edition {i}')
+
+    def purge(self):
+        call_command('purge_deleted', '--batch-size', '1', stdout=StringIO())
+
+    def test_book_and_its_rows_are_removed_in_batches(self):
+        self.book.soft_delete()
+        in_batches = PurgeDeletedCommand.in_batches
+        batches = []
+
+        def record_batches(command, queryset):
+            for ids in in_batches(command, queryset):
+                batches.append(ids)
+                yield ids
+
+        with mock.patch.object(PurgeDeletedCommand, 'in_batches', record_batches):
+            self.purge()
+
+        # Three copies, then two genre links, one per batch
+        self.assertEqual([len(ids) for ids in batches], [1] * 5)
+        self.assertFalse(Book.all_objects.exists())
+        self.assertFalse(BookInstance.all_objects.exists())
+        self.assertFalse(Book.genre.through.objects.exists())
+
+    def test_book_restored_during_the_purge_is_kept(self):
+        self.book.soft_delete()
+        in_batches = PurgeDeletedCommand.in_batches
+
+        def restore_after_first_batch(command, queryset):
+            for i, ids in enumerate(in_batches(command, queryset)):
+                if i == 1:
+                    Book.all_objects.get(pk=self.book.pk).restore()
+                yield ids
+
+        with mock.patch.object(PurgeDeletedCommand, 'in_batches', restore_after_first_batch):
+            self.purge()
+
+        self.assertTrue(Book.objects.filter(pk=self.book.pk).exists())
+        self.assertEqual(BookInstance.objects.count(), 2)
+        self.assertEqual(self.book.genre.count(), 2)
+
+    def test_authors_books_are_detached(self):
+        self.author.soft_delete()
+        self.purge()
+
+        self.assertFalse(Author.all_objects.exists())
+        self.book.refresh_from_db()
+        self.assertIsNone(self.book.author)
+
+
+def record_call(**kwargs):
+    """Task used by TaskQueueTest"""
+
+
+class TaskQueueTest(TransactionTestCase):
+    def test_same_key_tasks_collapse(self):
+        for i in range(3):
+            enqueue(record_call, key='same', value=i)
+        enqueue(record_call, key='other')
+        enqueue(record_call)
+        enqueue(record_call)
+
+        self.assertEqual(Task.objects.filter(key='same').count(), 1)
+        self.assertEqual(Task.objects.filter(key='other').count(), 1)
+        self.assertEqual(Task.objects.filter(key='').count(), 2)
+
+    def test_tasks_are_queued_after_commit(self):
+        with transaction.atomic():
+            enqueue(record_call)
+            self.assertFalse(Task.objects.exists())
+        self.assertTrue(Task.objects.exists())
+
+    def test_claim_tasks_skips_future_and_claimed_tasks(self):
+        due = Task.objects.create(name='catalog.tests.record_call')
+        Task.objects.create(name='catalog.tests.record_call', run_after=timezone.now() + datetime.timedelta(hours=1))
+
+        self.assertEqual([task.id for task in claim_tasks(10)], [due.id])
+        due.refresh_from_db()
+        self.assertEqual(due.status, Task.RUNNING)
+        self.assertIsNotNone(due.claimed_at)
+        self.assertEqual(claim_tasks(10), [])
+
+    def test_failed_task_is_retried_with_backoff(self):
+        task = Task.objects.create(name='catalog.tests.record_call', max_attempts=3)
+
+        before = timezone.now()
+        complete_task(task, 'first failure')
+        task.refresh_from_db()
+        self.assertEqual((task.status, task.attempts), (Task.PENDING, 1))
+        self.assertGreaterEqual(task.run_after, before + datetime.timedelta(seconds=RETRY_DELAY))
+
+        complete_task(task, 'second failure')
+        task.refresh_from_db()
+        self.assertGreaterEqual(task.run_after, before + datetime.timedelta(seconds=RETRY_DELAY * 2))
+
+        complete_task(task, 'third failure')
+        task.refresh_from_db()
+        self.assertEqual((task.status, task.attempts, task.last_error), (Task.FAILED, 3, 'third failure'))
+
+    def test_completed_task_is_removed(self):
+        task = Task.objects.create(name='catalog.tests.record_call')
+        complete_task(task)
+        self.assertFalse(Task.objects.exists())
+
+    def test_stale_running_task_is_requeued(self):
+        stale = Task.objects.create(
+            name='catalog.tests.record_call', status=Task.RUNNING,
+            claimed_at=timezone.now() - datetime.timedelta(minutes=20))
+        running = Task.objects.create(name='catalog.tests.record_call', status=Task.RUNNING, claimed_at=timezone.now())
+
+        self.assertEqual(requeue_stale_tasks(600), 1)
+        stale.refresh_from_db()
+        running.refresh_from_db()
+        self.assertEqual((stale.status, stale.attempts), (Task.PENDING, 1))
+        self.assertEqual(running.status, Task.RUNNING)
+
+    def test_expired_claim_does_not_complete_the_task(self):
+        Task.objects.create(name='catalog.tests.record_call')
+        [first_run] = claim_tasks(1)
+        Task.objects.filter(id=first_run.id).update(claimed_at=timezone.now() - datetime.timedelta(minutes=20))
+        first_run.refresh_from_db()
+        requeue_stale_tasks(600)
+        Task.objects.update(run_after=timezone.now())
+        [second_run] = claim_tasks(1)
+
+        # The first run finishes late, the second run's claim is untouched
+        self.assertFalse(complete_task(first_run))
+        self.assertFalse(complete_task(first_run, 'late failure'))
+        second_run.refresh_from_db()
+        self.assertEqual((second_run.status, second_run.attempts), (Task.RUNNING, 1))
+
+        self.assertTrue(complete_task(second_run, 'failure'))
+        self.assertEqual(Task.objects.count(), 1)
+
+    def test_stats_refresh_is_only_queued_when_counts_change(self):
+        language = Language.objects.create(name='English')
+        book = Book.objects.create(title='The Hobbit', summary='', isbn='9780306406157', language=language)
+        copy = BookInstance.objects.create(book=book, imprint='First edition')
+        Task.objects.all().delete()
+
+        book.summary = 'There and back again'
+        book.save()
+        copy.imprint = 'Second edition'
+        copy.save()
+        self.assertFalse(Task.objects.filter(key='catalog-stats').exists())
+
+        copy.status = BookInstance.AVAILABLE
+        copy.save()
+        self.assertTrue(Task.objects.filter(key='catalog-stats').exists())
+
+
+class SimilarBooksTest(TransactionTestCase):
+    def setUp(self):
+        self.language = Language.objects.create(name='English')
+        self.fantasy = Genre.objects.create(name='Fantasy')
+        self.books = []
+        for i in range(8):
+            book = Book.objects.create(title=f'Book {i}', summary='', isbn='9780306406157', language=self.language)
+            book.genre.add(self.fantasy)
+            self.books.append(book)
+
+    def similar_ids(self, book):
+        return set(SimilarBook.objects.filter(book=book).values_list('similar_id', flat=True))
+
+    def stored_similar(self, book):
+        return list(SimilarBook.objects.filter(book=book).order_by('-score', 'similar_id').values_list('score', 'similar'))
+
+    def test_books_sharing_most_genres_rank_first(self):
+        # More books than TOP_N in the genre, with the best match added last
+        for i in range(8, 14):
+            book = Book.objects.create(title=f'Book {i}', summary='', isbn='9780306406157', language=self.language)
+            book.genre.add(self.fantasy)
+        dragons = Genre.objects.create(name='Dragons')
+        match = Book.objects.create(title='Book 14', summary='', isbn='9780306406157', language=self.language)
+        match.genre.add(self.fantasy, dragons)
+        self.books[0].genre.add(dragons)
+        french = Language.objects.create(name='French')
+        Book.objects.create(title='Livre', summary='', isbn='9780306406157', language=french).genre.add(self.fantasy)
+        # Same author but no shared genre
+        author = Author.objects.create(first_name='John', last_name='Tolkien')
+        Book.objects.filter(id=self.books[0].id).update(author=author)
+        by_author = Book.objects.create(
+            title='Letters', author=author, summary='', isbn='9780306406157', language=self.language)
+
+        build_similar_books()
+        similar = self.stored_similar(self.books[0])
+        self.assertEqual(similar[:2], [(2.5, match.id), (2.5, by_author.id)])
+        self.assertEqual(len(similar), 10)
+        self.assertTrue(all(score == 1.5 for score, other in similar[2:]))
+
+        # The incremental refresh ranks the same way as the full build
+        for book in Book.objects.all():
+            self.assertEqual(_compute_similar(book.id), self.stored_similar(book))
+
+    def test_hard_delete_refreshes_former_neighbours(self):
+        build_similar_books()
+        # Not in the neighbours' lists yet, its own refresh task isn't run
+        added = Book.objects.create(title='Book 8', summary='', isbn='9780306406157', language=self.language)
+        added.genre.add(self.fantasy)
+        deleted = self.books[0]
+        deleted_id = deleted.id
+
+        deleted.delete()
+        payload = json.loads(Task.objects.get(key='deleted-%s' % deleted_id).payload)
+        self.assertEqual(set(payload['affected_ids']), {book.id for book in self.books[1:]})
+
+        refresh_similar_books(**payload)
+        self.assertEqual(self.similar_ids(self.books[1]), {book.id for book in self.books[2:]} | {added.id})
+
+
+class AdminChecksTest(TestCase):
+    def test_admin_checks_discover_the_admin_modules(self):
+        with mock.patch('django.contrib.admin.autodiscover') as autodiscover:
+            run_checks(tags=['admin'])
+        autodiscover.assert_called_once_with()
+
+        self.assertEqual(run_checks(tags=['admin']), [])
+        self.assertIn(Book, admin.site._registry)
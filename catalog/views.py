@@ -1,28 +1,21 @@
-from django.contrib.auth.decorators import login_required, permission_required
+from django.contrib.auth.decorators import login_required
 from django.contrib.auth.mixins import LoginRequiredMixin, PermissionRequiredMixin
-from django.http import HttpResponse, HttpResponseRedirect
+from django.http import Http404, HttpResponse, JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
-from django.urls import reverse_lazy
+from django.urls import reverse
 from django.views import generic
-from django.views.generic.edit import CreateView, UpdateView, DeleteView
 
-import datetime
-
-from .forms import RenewBookModelForm
-from catalog.models import Author, Book, BookInstance, Genre
+from .autocomplete import AUTHOR, BOOK, autocomplete_index
+from .isbn import canonical_isbn
+from .loans import get_user_loans, group_loans
+from .tasks import get_catalog_stats
+from catalog.models import Author, Book, BookInstance, Genre, SimilarBook
 
 def index(request):
     """View function for home page of our catalog app"""
 
-    # Generate counts of main objects
-    num_books = Book.objects.all().count()
-    num_instances = BookInstance.objects.all().count()
-
-    # Available books
-    num_instances_available = BookInstance.objects.filter(status__exact=BookInstance.AVAILABLE).count()
-
-    # Authors
-    num_authors = Author.objects.all().count()
+    # Counts of main objects, recomputed by the refresh_catalog_stats task
+    stats = get_catalog_stats()
 
     # Genres
     genres = Genre.objects.all()
@@ -32,10 +25,7 @@ def index(request):
     request.session['num_visits'] = num_visits + 1
 
     context = {
-        'num_books': num_books,
-        'num_instances': num_instances,
-        'num_instances_available': num_instances_available,
-        'num_authors': num_authors,
+        **stats,
         'genre_list': genres,
         'num_visits': num_visits,
     }
@@ -82,11 +72,64 @@ class BookListByGenreView(generic.ListView):
 @login_required
 def book_detail_view(request, book_id):
     book = get_object_or_404(Book, pk=book_id)
+
+    # Precomputed by build_similar_books and the refresh_similar_books task
+    similar_books = (
+        SimilarBook.objects.filter(book=book, similar__deleted_at__isnull=True)
+        .select_related('similar__author')
+        .order_by('-score')[:5]
+    )
+
     context = {
         'book': book,
+        'similar_books': similar_books,
     }
     return render(request, 'catalog/book_detail.html', context=context)
 
+def book_isbn_lookup_view(request, isbn):
+    """Returns the book with the given ISBN-10 or ISBN-13 as JSON"""
+    normalized_isbn = canonical_isbn(isbn)
+    if normalized_isbn is None:
+        raise Http404('Invalid ISBN')
+
+    # Prefer the oldest entry until duplicates are merged by dedupe_books
+    book = Book.objects.select_related('author').filter(isbn=normalized_isbn).order_by('id').first()
+    if book is None:
+        raise Http404('No book found with this ISBN')
+
+    data = {
+        'id': book.id,
+        'title': book.title,
+        'author': str(book.current_author) if book.current_author else None,
+        'isbn': book.isbn,
+        'url': book.get_absolute_url(),
+    }
+    return JsonResponse(data)
+
+def autocomplete_view(request):
+    """Returns book titles and author names starting with the `q` parameter"""
+    prefix = request.GET.get('q', '')
+    kind = request.GET.get('type')
+    if kind not in (BOOK, AUTHOR):
+        kind = None
+
+    try:
+        limit = min(int(request.GET.get('limit', 10)), 50)
+    except ValueError:
+        limit = 10
+
+    url_names = {BOOK: 'book-detail', AUTHOR: 'author-detail'}
+    results = [
+        {
+            'type': result_kind,
+            'id': object_id,
+            'label': label,
+            'url': reverse(url_names[result_kind], args=[object_id]),
+        }
+        for result_kind, object_id, label in autocomplete_index.search(prefix, limit, kind)
+    ]
+    return JsonResponse({'results': results})
+
 class BookDetailView(generic.DetailView):
     model = Book
     context_object_name = 'book'
@@ -106,13 +149,31 @@ class AuthorDetailView(generic.DetailView):
     pk_url_kwarg = 'author_id'
 
 class LoanedBooksByUserListView(LoginRequiredMixin, generic.ListView):
-    """Generic class-based view listing book instances on loan to current user"""
+    """Generic class-based view listing book instances on loan to current user, grouped by due date"""
     model = BookInstance
     template_name = 'catalog/bookinstance_list_borrowed_user.html'
-    paginate_by = 10
+    context_object_name = 'bookinstance_list'
 
     def get_queryset(self):
-        return BookInstance.objects.filter(borrower=self.request.user).filter(status__iexact=BookInstance.ON_LOAN).order_by('due_back')
+        return get_user_loans(self.request.user)
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['loan_buckets'] = group_loans(self.object_list)
+        return context
+
+@login_required
+def loaned_books_by_user_json_view(request):
+    """Returns the current user's loans grouped by due date as JSON"""
+    loans = get_user_loans(request.user)
+    data = {
+        bucket: [
+            {field: value for field, value in loan.items() if field != 'due_bucket'}
+            for loan in bucket_loans
+        ]
+        for bucket, label, bucket_loans in group_loans(loans)
+    }
+    return JsonResponse(data)
 
 def bookinstance_return_view(request, bookinstance_id):
     bookinstance_item = get_object_or_404(BookInstance, id=bookinstance_id)
@@ -138,76 +199,3 @@ class LoanedBookListView(PermissionRequiredMixin, generic.ListView):
         context = super().get_context_data(**kwargs)
         context['loaned_book_list'] = self.bookinstance_list
         return context
-
-@permission_required('catalog.can_renew')
-def bookinstance_renew_view(request, bookinstance_id):
-    bookinstance_item = get_object_or_404(BookInstance, id=bookinstance_id)
-
-    # If this is a POST request, process the Form data
-    if request.method == 'POST':
-
-        # Create a form instance and populate it with data from the request
-        renew_book_form = RenewBookModelForm(request.POST)
-        valid = renew_book_form.is_valid()
-
-        # Validate
-        if renew_book_form.is_valid():
-            # Process/save validated data
-            bookinstance_item.due_back = renew_book_form.cleaned_data['due_back']
-            bookinstance_item.save()
-
-            # Redirect
-            return HttpResponseRedirect(reverse('loaned-books'))
-        
-    else:
-        proposed_renewal_date = datetime.date.today() + datetime.timedelta(weeks=3)
-        initial_data = {
-                'due_back': proposed_renewal_date,
-        }
-        renew_book_form = RenewBookModelForm(initial=initial_data)
-
-    context = {
-            'form': renew_book_form,
-            'bookinstance_item': bookinstance_item,
-    }
-
-    return render(request, 'catalog/bookinstance_renew.html', context)
-
-
-class AuthorCreateView(PermissionRequiredMixin, CreateView):
-    model = Author
-    fields = '__all__'
-    permission_required = 'catalog.can_edit_authors'
-
-class AuthorUpdateView(PermissionRequiredMixin, UpdateView):
-    model = Author
-    fields = ['first_name', 'last_name', 'date_of_birth', 'date_of_death']
-    permission_required = 'catalog.can_edit_authors'
-    template_name_suffix = '_update_form'
-
-class AuthorDeleteView(PermissionRequiredMixin, DeleteView):
-    model = Author
-    success_url = reverse_lazy('author-list')
-    template_name_suffix = '_delete_confirmation'
-    permission_required = 'catalog.can_edit_authors'
-
-class BookCreateView(PermissionRequiredMixin, CreateView):
-    model = Book
-    permission_required = 'catalog.can_edit_books'
-    fields = '__all__'
-    template_name_suffix = '_create_form'
-
-class BookUpdateView(PermissionRequiredMixin, UpdateView):
-    model = Book
-    permission_required = 'catalog.can_edit_books'
-    fields = '__all__'
-    exclude = ['id']
-    template_name_suffix = '_update_form'
-    pk_url_kwarg = 'book_id'
-
-class BookDeleteView(PermissionRequiredMixin, DeleteView):
-    model = Book
-    success_url = reverse_lazy('book-list')
-    template_name_suffix = '_confirm_delete'
-    permission_required = 'catalog.can_edit_books'
-    pk_url_kwarg = 'book_id'
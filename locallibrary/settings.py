@@ -31,7 +31,8 @@ ALLOWED_HOSTS = []
 # Application definition
 
 INSTALLED_APPS = [
-    'django.contrib.admin',
+    # Admin modules are discovered by locallibrary/urls.py and the admin checks
+    'locallibrary.apps.LazyAdminConfig',
     'django.contrib.auth',
     'django.contrib.contenttypes',
     'django.contrib.sessions',
@@ -84,6 +85,39 @@ DATABASES = {
 }
 
 
+# Authentication
+# Permissions are cached per user, see catalog/backends.py
+
+AUTHENTICATION_BACKENDS = [
+    'catalog.backends.CachedPermissionBackend',
+]
+
+
+# Cache
+# Permissions, loans and home page counts are cached and invalidated from any
+# worker process (including `manage.py run_tasks`), so the cache must be
+# shared between processes. Create the table with `manage.py createcachetable`,
+# or use Memcached in production.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'catalog_cache',
+    }
+}
+
+
+# Catalog
+# Deleting a book or author only hides it; run `manage.py purge_deleted`
+# periodically to remove it along with its copies
+
+CATALOG_SOFT_DELETE = True
+
+# Import rarely used views and the admin on their first request, so a cold
+# worker serves the catalog pages sooner (see `manage.py profile_startup`)
+LAZY_VIEWS = True
+
+
 # Password validation
 # https://docs.djangoproject.com/en/2.1/ref/settings/#auth-password-validators
 
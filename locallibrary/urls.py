@@ -15,13 +15,36 @@ Including another URLconf
 """
 from django.contrib import admin
 from django.urls import path
+from django.urls.resolvers import RoutePattern
 from django.conf import settings
 from django.conf.urls import include
 from django.conf.urls.static import static
+from django.utils.functional import cached_property
 from django.views.generic import RedirectView
 
+from catalog.lazy import LazyURLResolver
+
+
+class LazyAdminURLConf:
+    """Registers the ModelAdmins and builds the admin URLs on first use"""
+
+    @cached_property
+    def urlpatterns(self):
+        admin.autodiscover()
+        return admin.site.get_urls()
+
+
+# NOTE: INSTALLED_APPS uses LazyAdminConfig, so outside of the system checks
+# admin modules are only imported here, on the first admin request when
+# LAZY_VIEWS is on
+if settings.LAZY_VIEWS:
+    admin_urls = LazyURLResolver(RoutePattern('admin/'), LazyAdminURLConf(), app_name='admin', namespace=admin.site.name)
+else:
+    admin.autodiscover()
+    admin_urls = path('admin/', admin.site.urls)
+
 urlpatterns = [
-    path('admin/', admin.site.urls),
+    admin_urls,
     path('catalog/', include('catalog.urls')),
     path('', RedirectView.as_view(url='/catalog/')),
     path('accounts/', include('django.contrib.auth.urls')),